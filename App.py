@@ -1,11 +1,20 @@
+import os
+import threading
+
 from PyQt6.QtCore import Qt, QTimer, pyqtSignal, QOperatingSystemVersion, QEvent
-from PyQt6.QtGui import QFont, QIcon
-from PyQt6.QtWidgets import QVBoxLayout, QWidget, QTabWidget
+from PyQt6.QtGui import QFont, QIcon, QKeySequence, QShortcut
+from PyQt6.QtWidgets import QMessageBox, QVBoxLayout, QWidget, QTabWidget
 
+from src import perf, startup
 from src.keyboard_handler import KeyboardHandler
-from src.db_handlers import DBReader
-from src.utils import init_database, load_config, save_config, get_resource_path
-
+from src.maintenance import Maintenance
+from src.data_notifier import DataNotifier
+from src.db_handlers import DBReader, CACHE_DAYS, CACHE_MAX_BYTES
+from src.query_service import QueryService
+from src.utils import init_database, load_config, save_config, get_resource_path, get_db_path
+
+from src.startup import Warmup
+from src.views.PerfOverlay import PerfOverlay
 from src.views.WPMGraph import WPMGraph
 
 MIN_BIN_SIZE = 5
@@ -13,27 +22,69 @@ MIN_BIN_SIZE = 5
 
 class App(QWidget):
     modeToggled = pyqtSignal()
+    # the listener is started off the GUI thread, a failure is reported back through this
+    keyboardFailed = pyqtSignal(str)
 
     def __init__(self):
         super().__init__()
         init_database()
-        self.db = DBReader()
         self.config = load_config()
+        if self.config.get("perf"):
+            perf.enable()
+
+        # the listener comes first and pynput is imported on a thread of its own,
+        # so keys typed while the window is still being built are recorded
+        self.keyboard_handler = KeyboardHandler(MIN_BIN_SIZE,
+                                                archive_intervals=self.config.get("archive_intervals", False))
+        self.keyboardFailed.connect(self.on_keyboard_failed)
+        self.keyboard_thread = threading.Thread(target=self.start_keyboard, name="TypeSpeedMonitor-keyboard",
+                                                daemon=True)
+        self.keyboard_thread.start()
+        # matplotlib is imported in the background at the same time, the summary is built once it is done
+        self.warmup = Warmup(parent=self)
+        self.warmup.stageReady.connect(self.on_stage_ready)
+        self.warmup.start()
+
+        self.db = DBReader(cache_days=self.config.get("cache_days", CACHE_DAYS),
+                           cache_max_bytes=self.config.get("cache_max_mb", CACHE_MAX_BYTES // 2 ** 20) * 2 ** 20)
+        self.notifier = DataNotifier(self.db, parent=self)
+        self.queries = QueryService(self.db, parent=self)
+        # builds or catches up the history snapshot on a worker, the other readers then only map it
+        self.queries.submit("snapshot", lambda db: db.prepare_snapshot(),
+                            lambda stats: print("History snapshot ready:", stats))
+        # checkpoints, vacuum, ANALYZE and integrity checks, only while the window is in the background
+        self.maintenance = Maintenance(self.db.db_path)
+        self.maintenance.start()
         self.dark_mode = self.config['dark_mode']
-        self.init_ui()
-
-        self.keyboard_handler = KeyboardHandler(MIN_BIN_SIZE)
-        self.keyboard_handler.start_monitoring()
-
         self.summary_graph = None
-
-        timer = QTimer()
-        timer.singleShot(10000, self.post_init)
+        self.init_ui()
+        self.keyboard_handler.writer.add_commit_listener(self.notifier.notify)
+        startup.mark("app created")
 
         self.focus_timer = QTimer()
         self.focus_timer.timeout.connect(self.check_focus)
         self.focus_timer.start(1000)
 
+    def start_keyboard(self):
+        # no display or no input monitoring permission shows up here, as an import or listener error
+        try:
+            self.keyboard_handler.start_monitoring()
+        except Exception as e:
+            self.keyboardFailed.emit(f"{type(e).__name__}: {e}")
+            return
+        startup.mark("keyboard monitoring started")
+
+    def on_keyboard_failed(self, error):
+        # history stays browsable, but nothing new is recorded this session
+        print(f"Keyboard monitoring failed to start: {error}")
+        QMessageBox.critical(self, "TypeSpeedMonitor",
+                             f"Keyboard monitoring could not be started, typing is not being recorded.\n\n{error}")
+
+    def on_stage_ready(self, stage):
+        if stage == "summary":
+            self.post_init()
+            startup.mark("summary built")
+
     def post_init(self):
         if self.summary_graph is None:
             from src.views.SummaryGraph import SummaryGraph
@@ -72,7 +123,24 @@ class App(QWidget):
 
         self.set_style()
 
+        # stage timings, enabled with TYPESPEEDMONITOR_PERF=1 or "perf": true in the config
+        self.perf_overlay = None
+        if perf.enabled:
+            self.perf_overlay = PerfOverlay(self)
+            QShortcut(QKeySequence("Ctrl+Shift+P"), self, self.perf_overlay.toggle)
+            QShortcut(QKeySequence("Ctrl+Shift+D"), self, self.dump_perf)
+
+    def dump_perf(self):
+        path = self.config.get("perf_dump") or os.path.join(os.path.dirname(get_db_path()), "perf.json")
+        perf.dump(path)
+
+    def resizeEvent(self, event):
+        if self.perf_overlay:
+            self.perf_overlay.place()
+        super().resizeEvent(event)
+
     def check_focus(self):
+        self.maintenance.set_idle(not self.isActiveWindow())
         if self.isActiveWindow():
             self.wpm_graph.resume()
             if self.summary_graph:
@@ -145,6 +213,15 @@ class App(QWidget):
             """)
 
     def closeEvent(self, event):
+        if perf.enabled:
+            self.dump_perf()
+        self.maintenance.stop()
+        # the listener has to exist before it can be stopped
+        self.keyboard_thread.join()
         self.keyboard_handler.stop()
+        self.wpm_graph.stop()
+        if self.summary_graph:
+            self.summary_graph.stop()
+        self.queries.shutdown()
         self.db.close()
         event.accept()
@@ -0,0 +1,69 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.binning import bin_values
+
+MIN_BIN_SIZE = 5
+
+
+def legacy_binning(data, time_bins):
+    # the nested loop WPMGraph.plot used before src.binning existed
+    values = []
+    for i in range(len(time_bins) - 1):
+        bin_data = [val for ts, val in data if time_bins[i] <= ts < time_bins[i + 1]]
+        values.append(np.mean(bin_data) if bin_data else np.nan)
+    return values
+
+
+def make_rows(n_rows, start=1_700_000_000):
+    rng = np.random.default_rng(0)
+    timestamps = start + np.arange(n_rows) * MIN_BIN_SIZE
+    values = rng.integers(20, 140, n_rows)
+    return timestamps, values
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time WPMGraph binning against the number of rows in view.")
+    parser.add_argument("--bins", type=int, default=240)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--legacy-limit", type=int, default=20_000,
+                        help="largest row count the nested-loop reference is run for")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'vectorized ms':>14} {'ns/row':>8} {'legacy ms':>10}")
+    for n_rows in (1_000, 10_000, 100_000, 1_000_000, 5_000_000):
+        timestamps, values = make_rows(n_rows)
+        edges = np.linspace(timestamps[0], timestamps[-1] + 1, args.bins + 1)
+
+        # the plot path starts from the row tuples returned by DBReader.read_data
+        rows = list(zip(timestamps.tolist(), values.tolist()))
+
+        def vectorized():
+            ts, vals = np.array(rows, dtype=np.float64).reshape(-1, 2).T
+            bin_values(ts, vals, edges)
+
+        elapsed = best_of(vectorized, args.repeat)
+        legacy = ""
+        if n_rows <= args.legacy_limit:
+            legacy = f"{best_of(lambda: legacy_binning(rows, edges), 1) * 1e3:10.1f}"
+
+        print(f"{n_rows:>10} {elapsed * 1e3:14.2f} {elapsed / n_rows * 1e9:8.1f} {legacy:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from common import EXCLUDED_KEYS, Key, KeyCode, summarize_ns
+
+from src.db_handlers import DBWriter
+from src.keyboard_handler import KeyboardHandler
+from src.utils import init_database
+
+
+def typing_times(rng, n, start_ns):
+    # ~65 WPM bursts with the odd pause, so bins fill, flush and get skipped
+    gaps = rng.exponential(0.18, n)
+    pauses = rng.random(n) < 0.01
+    gaps[pauses] = rng.uniform(2, 30, pauses.sum())
+    return (start_ns + np.cumsum(gaps * 1e9)).astype(np.int64).tolist()
+
+
+def percentiles(samples):
+    stats = summarize_ns(samples)
+    return (f"n={stats['n']:>6}  p50 {stats['p50_ns']:7.0f} ns  "
+            f"p99 {stats['p99_ns']:7.0f} ns  max {stats['max_ns']:9.0f} ns")
+
+
+def timed(fn, events):
+    timings = []
+    counter = time.perf_counter_ns
+    for key in events:
+        start = counter()
+        fn(key)
+        timings.append(counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time KeyboardHandler.on_press/on_release per event.")
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--archive", action="store_true", help="enable the interval archive")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    chars = [KeyCode(c) for c in "etaoinshrdlucmfwypvbgkjqxz"]
+    typed = [chars[i] for i in rng.integers(0, len(chars), args.events)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "data.db")
+        init_database(db_path)
+
+        start_ns = time.perf_counter_ns()
+        times = typing_times(rng, args.events + 1, start_ns)
+        clock = iter([start_ns] + times).__next__
+        # read only when a bin is flushed, follows the scripted time of the key being pressed
+        scripted = {"now": start_ns}
+        wall_offset = time.time_ns() - start_ns
+
+        handler = KeyboardHandler(5, archive_intervals=args.archive, db=DBWriter(db_path), clock=clock,
+                                  wall_clock=lambda: wall_offset + scripted["now"])
+        handler.excluded_keys = EXCLUDED_KEYS
+
+        overhead = timed(lambda key: None, typed[:10000])
+
+        # bins are flushed from inside on_press, split those out from the common path
+        flushes = []
+        press = []
+        counter = time.perf_counter_ns
+        for key, t in zip(typed, times):
+            scripted["now"] = t
+            bin_end = handler.bin_end
+            start = counter()
+            handler.on_press(key)
+            elapsed = counter() - start
+            (flushes if handler.bin_end != bin_end else press).append(elapsed)
+
+        release = timed(handler.on_release, typed)
+
+        handler.on_press(Key.ctrl)
+        shortcut = timed(handler.on_press, typed[:10000])
+        handler.on_release(Key.ctrl)
+
+        special = timed(handler.on_press, [Key.shift, Key.space] * 5000)
+
+        handler.writer.stop()
+        handler.db.close()
+
+    print(f"timer overhead      {percentiles(overhead)}")
+    print(f"on_press            {percentiles(press)}")
+    print(f"on_press, bin flush {percentiles(flushes)}")
+    print(f"on_press, ctrl held {percentiles(shortcut)}")
+    print(f"on_press, special   {percentiles(special)}")
+    print(f"on_release          {percentiles(release)}")
+    print("writer:", handler.writer.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from common import summarize
+from synthetic import generate
+
+from src import perf
+from src.db_handlers import DBWriter
+from src.maintenance import Maintenance
+
+
+def file_state(db_path):
+    conn = sqlite3.connect(db_path)
+    free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    pages = conn.execute("PRAGMA page_count").fetchone()[0]
+    conn.close()
+    wal = db_path + "-wal"
+    return (f"{pages} pages, {free} free, file {os.path.getsize(db_path) / 2 ** 20:.1f} MB, "
+            f"WAL {os.path.getsize(wal) / 2 ** 20 if os.path.exists(wal) else 0:.1f} MB")
+
+
+def write_while(db_path, seconds, interval):
+    # what the keyboard handler's writer does: one small transaction every few ms, timed
+    writer = DBWriter(db_path)
+    latencies = []
+    ts = int(time.time()) + 10 ** 6
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        ts += 5
+        start = time.perf_counter()
+        writer.insert_many([(ts, 60)])
+        latencies.append(time.perf_counter() - start)
+        time.sleep(interval)
+    writer.close()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Commit latency of the writer with and without idle maintenance.")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--delete-days", type=int, default=120, help="history deleted up front to leave free pages")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--interval", type=float, default=0.02)
+    args = parser.parse_args()
+
+    perf.enable()
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "data.db")
+        generate(db_path, args.days)
+        conn = sqlite3.connect(db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA wal_autocheckpoint=0")
+        cutoff = int(time.time()) - (args.days - args.delete_days) * 86400
+        conn.execute("DELETE FROM log_data WHERE timestamp < ?", (cutoff,))
+        conn.commit()
+        # closing the last connection would checkpoint the WAL, this one stays open until the end
+        print("before:", file_state(db_path))
+
+        baseline = summarize(write_while(db_path, args.seconds, args.interval))
+
+        maintenance = Maintenance(db_path)
+        maintenance.set_idle(True)
+        maintenance.start()
+        during = summarize(write_while(db_path, args.seconds, args.interval))
+        maintenance.stop()
+        print("after: ", file_state(db_path))
+        conn.close()
+
+        print(f"{'writer commit':>22} {'p50 ms':>8} {'max ms':>8}")
+        for name, stats in (("without maintenance", baseline), ("during maintenance", during)):
+            print(f"{name:>22} {stats['p50_ms']:8.2f} {stats['max_ms']:8.2f}")
+        for stage, stats in perf.snapshot().items():
+            if stage.startswith("maintenance."):
+                print(f"{stage:>26}: {stats['count']} steps, p50 {stats['p50_ms']:.2f} ms, max {stats['max_ms']:.2f} ms")
+        print(f"steps {maintenance.steps}, skipped {maintenance.skipped}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+
+from common import summarize
+from synthetic import generate
+
+from src.db_handlers import DBReader
+
+DAY = 60 * 60 * 24
+# the distances WPMGraph asks for at its scroll steps, from a minute up to ten years
+DISTANCES = {
+    "minute": 60,
+    "hour": 3600,
+    "day": DAY,
+    "week": 7 * DAY,
+    "month": 30 * DAY,
+    "year": 365 * DAY,
+    "10 years": 3650 * DAY,
+}
+
+
+def sql_max(cur, point, distance):
+    cur.execute("SELECT MAX(value) FROM log_data WHERE timestamp BETWEEN ? AND ?",
+                (point - distance, point + distance))
+    result = cur.fetchone()
+    return result[0] if result and result[0] is not None else 60
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare get_max against a plain MAX(value) query.")
+    parser.add_argument("--days", type=int, default=5 * 365)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--db", help="existing database to use instead of a synthetic one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = args.db
+        if not db_path:
+            db_path = os.path.join(tmp, "data.db")
+            start = time.perf_counter()
+            n_rows = generate(db_path, args.days)
+            print(f"generated {n_rows} rows over {args.days} days in {time.perf_counter() - start:.1f}s")
+
+        conn = sqlite3.connect(db_path)
+        cur = conn.cursor()
+        cur.execute("SELECT MIN(timestamp), MAX(timestamp) FROM log_data")
+        first, last = cur.fetchone()
+
+        db = DBReader(db_path)
+        start = time.perf_counter()
+        db.sync_cache()
+        print(f"initial sync with index build: {(time.perf_counter() - start) * 1e3:.1f} ms")
+
+        rng = np.random.default_rng(0)
+        for name, distance in DISTANCES.items():
+            points = rng.integers(first, last + 1, args.queries).tolist()
+
+            sql_times, index_times = [], []
+            for point in points:
+                t0 = time.perf_counter()
+                expected = sql_max(cur, point, distance)
+                t1 = time.perf_counter()
+                result = db.get_max(point, distance)
+                t2 = time.perf_counter()
+                sql_times.append(t1 - t0)
+                index_times.append(t2 - t1)
+                if result != expected:
+                    raise AssertionError(f"get_max({point}, {distance}) = {result}, expected {expected}")
+
+            sql_stats, index_stats = summarize(sql_times), summarize(index_times)
+            print(f"{name:>9}: SQL MAX mean {sql_stats['mean_ms']:8.3f} ms, max {sql_stats['max_ms']:8.3f} ms | "
+                  f"index mean {index_stats['mean_ms']:6.3f} ms, max {index_stats['max_ms']:6.3f} ms")
+
+        db.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
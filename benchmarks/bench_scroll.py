@@ -0,0 +1,62 @@
+import argparse
+import os
+import tempfile
+import time
+
+from common import BenchHost, get_app, summarize
+from synthetic import generate
+
+from src.db_handlers import DBReader
+from src.views.WPMGraph import WPMGraph
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scroll WPMGraph back through history and time each frame.")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--mult", type=int, default=24 * 60)
+    parser.add_argument("--steps", type=int, default=300)
+    parser.add_argument("--interval", type=float, default=0.03, help="seconds between scroll events")
+    args = parser.parse_args()
+
+    app = get_app()
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "data.db")
+        generate(db_path, args.days)
+        db = DBReader(db_path)
+
+        host = BenchHost(db, mult=args.mult)
+        graph = host.add(WPMGraph(host, db, bin_size=5))
+
+        frames = []
+        scheduler = graph.scheduler
+        render_motion, render_full = scheduler.render_motion, scheduler.render_full
+
+        def timed(render):
+            def wrapper():
+                start = time.perf_counter()
+                render()
+                frames.append(time.perf_counter() - start)
+            return wrapper
+
+        scheduler.render_motion = timed(render_motion)
+        scheduler.render_full = timed(render_full)
+
+        for _ in range(args.steps):
+            graph.on_scroll(1)
+            deadline = time.monotonic() + args.interval
+            while time.monotonic() < deadline:
+                app.processEvents()
+                time.sleep(0.001)
+
+        stats = summarize(frames)
+        print(f"{args.steps} scroll steps, {stats['n']} frames rendered")
+        # rasterizing happens on the render thread, these are the frames' cost on the GUI thread
+        print(f"frame mean {stats['mean_ms']:.2f} ms, p50 {stats['p50_ms']:.2f} ms, max {stats['max_ms']:.2f} ms")
+        print("prefetch:", graph.prefetcher.stats())
+
+        graph.stop()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
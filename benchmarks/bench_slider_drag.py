@@ -0,0 +1,82 @@
+import argparse
+import os
+import tempfile
+import time
+
+from PyQt6.QtCore import QPointF
+
+from common import BenchHost, get_app, summarize
+from synthetic import generate
+
+from src.db_handlers import DBReader
+from src.views.SummaryGraph import SummaryGraph
+
+
+class MoveEvent:
+    def __init__(self, x):
+        self.x = x
+
+    def position(self):
+        return QPointF(self.x, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drag the summary slider over a long history and time the GUI thread.")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--moves", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.016, help="seconds between mouse moves")
+    args = parser.parse_args()
+
+    app = get_app()
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "data.db")
+        generate(db_path, args.days)
+        db = DBReader(db_path)
+
+        host = BenchHost(db, summary_of="year")
+        summary = host.add(SummaryGraph(host, db))
+        slider = summary.slider
+
+        # every slice of GUI-thread work while dragging: the move itself and the frames it schedules
+        busy = []
+        scheduler = summary.scheduler
+        render_full = scheduler.render_full
+
+        def timed_render():
+            start = time.perf_counter()
+            render_full()
+            busy.append(time.perf_counter() - start)
+
+        scheduler.render_full = timed_render
+
+        # the start handle is dragged from the left end towards the end handle
+        slider.start_val = 0
+        slider.dragging_start = True
+        left, right = slider._val_to_pixel(0), slider._val_to_pixel(slider.end_val) - 10
+        drag_start = time.perf_counter()
+        for i in range(args.moves):
+            start = time.perf_counter()
+            slider.mouseMoveEvent(MoveEvent(left + (right - left) * i / args.moves))
+            busy.append(time.perf_counter() - start)
+
+            deadline = time.monotonic() + args.interval
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                app.processEvents()
+                busy.append(time.perf_counter() - start)
+                time.sleep(0.001)
+        slider.dragging_start = False
+        drag_time = time.perf_counter() - drag_start
+
+        stats = summarize(busy)
+        print(f"{args.moves} moves over {drag_time:.1f}s, GUI thread busy p50 {stats['p50_ms']:.2f} ms, "
+              f"max {stats['max_ms']:.2f} ms")
+        print("queries:", host.queries.stats())
+
+        summary.stop()
+        host.queries.shutdown()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
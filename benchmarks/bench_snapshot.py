@@ -0,0 +1,70 @@
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+
+from synthetic import generate
+
+from src.column_snapshot import ColumnSnapshot, snapshot_dir
+from src.utils import read_generation
+
+
+def sql_series(cur, start, end):
+    # what a cache miss cost before the snapshot
+    cur.execute("SELECT timestamp, value FROM log_data WHERE timestamp BETWEEN ? AND ?", (start, end))
+    rows = np.array(cur.fetchall(), dtype=np.float64).reshape(-1, 2)
+    return rows[:, 0].astype(np.int64), rows[:, 1]
+
+
+def rss_mb():
+    # current resident size, linux only
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Open the history snapshot and slice long ranges, against SQLite.")
+    parser.add_argument("--days", type=int, default=3 * 365)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "data.db")
+        generate(db_path, args.days)
+        conn = sqlite3.connect(db_path)
+        cur = conn.cursor()
+        generation = read_generation(cur)
+
+        start = time.perf_counter()
+        ColumnSnapshot(snapshot_dir(db_path)).sync(cur, generation)
+        print(f"first build: {time.perf_counter() - start:.2f}s")
+
+        # what every later start pays: map the files and look for new rows
+        rss = rss_mb()
+        start = time.perf_counter()
+        snapshot = ColumnSnapshot(snapshot_dir(db_path))
+        snapshot.sync(cur, generation)
+        print(f"open: {(time.perf_counter() - start) * 1000:.1f} ms for {snapshot.size} rows")
+
+        end = int(time.time())
+        ranges = [(days, end - days * 86400) for days in (30, 365, args.days)]
+        timings = []
+        for days, first in ranges:
+            start = time.perf_counter()
+            timestamps, values = snapshot.series(first, end)
+            timings.append((len(timestamps), time.perf_counter() - start))
+        print(f"resident memory grew {rss_mb() - rss:.1f} MB opening and slicing the snapshot")
+
+        for (days, first), (n_rows, mapped) in zip(ranges, timings):
+            start = time.perf_counter()
+            sql_series(cur, first, end)
+            sql = time.perf_counter() - start
+            print(f"{days:>5} days, {n_rows:>8} rows: snapshot {mapped * 1000:7.3f} ms, "
+                  f"sqlite {sql * 1000:8.1f} ms")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
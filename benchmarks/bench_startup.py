@@ -0,0 +1,86 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import ROOT, summarize
+from synthetic import generate
+
+
+def child():
+    # runs the real App in a fresh interpreter and reports when the first chart has been drawn
+    start = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+
+    from PyQt6.QtWidgets import QApplication
+
+    import src.keyboard_handler as keyboard_handler
+    from src.views.TimeSeriesChart import TimeSeriesChart
+
+    class Listener:
+        # pynput needs a display, the listener is not what is being measured
+        def stop(self):
+            pass
+
+        def join(self):
+            pass
+
+    keyboard_handler.KeyboardHandler.start_monitoring = lambda self: setattr(self, "listener", Listener())
+
+    set_image = TimeSeriesChart.set_image
+
+    def timed_set_image(self, image):
+        set_image(self, image)
+        # frames rendered before the first window was loaded have no title yet
+        if not self.state.title:
+            return
+        self.repaint()
+        print(json.dumps({"first_chart": time.perf_counter() - start}), flush=True)
+        os._exit(0)
+
+    TimeSeriesChart.set_image = timed_set_image
+
+    from App import App
+    app = QApplication(sys.argv[:1])
+    window = App()
+    window.show()
+    app.exec()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time from launch to the first drawn chart.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child()
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "data.db")
+        generate(db_path, args.days)
+        env = dict(os.environ, TYPESPEEDMONITOR_DB=db_path, QT_QPA_PLATFORM="offscreen")
+
+        timings = []
+        for _ in range(args.runs):
+            output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"],
+                                    env=env, capture_output=True, text=True, timeout=120).stdout
+            result = [json.loads(line) for line in output.splitlines() if line.startswith("{")]
+            if not result:
+                print(output)
+                raise RuntimeError("the app exited before drawing a chart")
+            timings.append(result[0]["first_chart"])
+
+    stats = summarize(timings)
+    print(f"time to first chart over {stats['n']} runs: mean {stats['mean_ms']:.0f} ms, "
+          f"p50 {stats['p50_ms']:.0f} ms, max {stats['max_ms']:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import argparse
+import os
+import tempfile
+
+import numpy as np
+from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+
+from common import BenchHost, get_app, summarize, time_calls, wait_rendered
+from synthetic import generate
+
+from src.db_handlers import DBReader
+from src.utils import apply_dark_theme
+from src.views.WPMGraph import WPMGraph
+
+
+def matplotlib_rebuild(graph, canvas):
+    # what a refresh cost when the chart was a matplotlib figure cleared and rebuilt every time
+    key = graph.get_window_key()
+    time_bins, binned, y_max = graph.load_window(key, graph.db)
+    label_positions, label_strings = graph.get_tick_labels((time_bins[:-1] + time_bins[1:]) / 2)
+    title, _, _ = graph.get_title(time_bins, graph.mult)
+
+    canvas.figure.clear()
+    ax = canvas.figure.add_subplot(111)
+    valid_mask = ~np.isnan(binned.mean)
+    ax.bar(time_bins[:-1][valid_mask], binned.mean[valid_mask], width=graph.bin_size,
+           color=graph.color, alpha=0.8, align='edge')
+    ax.set_xlim(time_bins[0], time_bins[-1])
+    ax.set_xticks(label_positions)
+    ax.set_xticklabels(label_strings, rotation=45, ha='right')
+    ax.set_ylabel('Words Per Minute (WPM)', fontsize=12)
+    ax.set_title(title, fontsize=12, fontweight='bold')
+    ax.grid(axis='y', alpha=0.6, linewidth=1.2, color='gray')
+    ax.set_ylim(0, y_max)
+    apply_dark_theme(ax)
+    canvas.figure.tight_layout()
+    canvas.draw()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare a WPMGraph refresh with a matplotlib figure rebuild.")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--mult", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    app = get_app()
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "data.db")
+        generate(db_path, args.days)
+        db = DBReader(db_path)
+
+        host = BenchHost(db, mult=args.mult)
+        graph = host.add(WPMGraph(host, db, bin_size=5))
+        app.processEvents()
+        print(f"{len(graph.get_time_bins(graph.get_window_key())) - 1} bars, chart {graph.chart.width()}x{graph.chart.height()}")
+
+        canvas = FigureCanvas(Figure(figsize=(8, 4)))
+        canvas.resize(graph.chart.size())
+
+        def refresh():
+            # drop cached windows so both paths pay for loading the data and always draw
+            graph.prefetcher.clear()
+            graph.rendered_window = None
+            graph.plot()
+            wait_rendered(graph.chart)
+
+        native = summarize(time_calls(refresh, args.repeat))
+        rebuild = summarize(time_calls(lambda: matplotlib_rebuild(graph, canvas), args.repeat))
+
+        print(f"{'':>18} {'mean ms':>9} {'p50 ms':>9} {'max ms':>9}")
+        for name, stats in (("native refresh", native), ("matplotlib rebuild", rebuild)):
+            print(f"{name:>18} {stats['mean_ms']:9.2f} {stats['p50_ms']:9.2f} {stats['max_ms']:9.2f}")
+        print(f"native refresh costs {native['p50_ms'] / rebuild['p50_ms']:.0%} of a matplotlib rebuild")
+
+        graph.stop()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
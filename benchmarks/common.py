@@ -0,0 +1,137 @@
+import enum
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import pyqtSignal
+from PyQt6.QtWidgets import QApplication, QWidget, QVBoxLayout
+
+from src.data_notifier import DataNotifier
+from src.query_service import QueryService
+
+
+class KeyCode:
+    # stands in for pynput.keyboard.KeyCode, which also hashes through repr()
+    __slots__ = ("char",)
+
+    def __init__(self, char):
+        self.char = char
+
+    def __repr__(self):
+        return repr(self.char)
+
+    def __eq__(self, other):
+        return isinstance(other, KeyCode) and self.char == other.char
+
+    def __hash__(self):
+        return hash(repr(self))
+
+
+class Key(enum.Enum):
+    # stands in for pynput.keyboard.Key, members are named like pynput's, `other` covers the rest
+    alt = 1
+    alt_l = 2
+    alt_r = 3
+    alt_gr = 4
+    backspace = 5
+    caps_lock = 6
+    cmd = 7
+    cmd_l = 8
+    cmd_r = 9
+    ctrl = 10
+    ctrl_l = 11
+    ctrl_r = 12
+    delete = 13
+    down = 14
+    end = 15
+    enter = 16
+    esc = 17
+    home = 18
+    left = 19
+    page_down = 20
+    page_up = 21
+    right = 22
+    shift = 23
+    shift_l = 24
+    shift_r = 25
+    space = 26
+    tab = 27
+    up = 28
+    other = 99
+
+
+# the same keys KeyboardHandler.start_monitoring excludes
+EXCLUDED_KEYS = {
+    Key.ctrl, Key.ctrl_l, Key.ctrl_r,
+    Key.alt, Key.alt_l, Key.alt_r,
+    Key.cmd, Key.cmd_l, Key.cmd_r,
+    Key.tab, Key.enter, Key.esc,
+    Key.backspace, Key.delete,
+    Key.up, Key.down, Key.left, Key.right,
+    Key.home, Key.end, Key.page_up, Key.page_down
+}
+
+
+def get_app():
+    return QApplication.instance() or QApplication(sys.argv[:1])
+
+
+class BenchHost(QWidget):
+    # stands in for App: the views only need its config, dark_mode, modeToggled, notifier and queries
+    modeToggled = pyqtSignal()
+
+    def __init__(self, db, mult=15, summary_of="day", dark_mode=True):
+        super().__init__()
+        self.config = {"dark_mode": dark_mode, "mult": mult, "summary_of": summary_of}
+        self.dark_mode = dark_mode
+        self.notifier = DataNotifier(db, parent=self)
+        self.queries = QueryService(db, parent=self)
+        self.setLayout(QVBoxLayout())
+        self.resize(1200, 800)
+
+    def add(self, view):
+        self.layout().addWidget(view)
+        self.show()
+        get_app().processEvents()
+        return view
+
+
+def wait_rendered(view):
+    # lets a RenderedView submit its pending render, waits for it and takes delivery
+    app = get_app()
+    app.processEvents()
+    view.renderer.wait()
+    app.processEvents()
+
+
+def time_calls(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def summarize_ns(samples):
+    samples = sorted(samples)
+    return {
+        "n": len(samples),
+        "p50_ns": samples[len(samples) // 2],
+        "p99_ns": samples[min(len(samples) - 1, len(samples) * 99 // 100)],
+        "max_ns": samples[-1],
+    }
+
+
+def summarize(timings):
+    timings = sorted(timings)
+    return {
+        "n": len(timings),
+        "mean_ms": sum(timings) / len(timings) * 1e3,
+        "p50_ms": timings[len(timings) // 2] * 1e3,
+        "max_ms": timings[-1] * 1e3,
+    }
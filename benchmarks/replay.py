@@ -0,0 +1,228 @@
+import argparse
+import contextlib
+import json
+import os
+import sqlite3
+import string
+import tempfile
+import time
+
+import numpy as np
+
+from common import EXCLUDED_KEYS, Key, KeyCode, summarize_ns
+
+from src.db_handlers import DBWriter
+from src.interval_archive import iter_chunks, rebin_key_times
+from src.keyboard_handler import KeyboardHandler, MIN_RECORDINGS, RECORDING_THRESHOLD
+from src.utils import init_database
+
+# a trace is a list of (seconds, "press" or "release", key name) in time order,
+# key names are the character itself or "Key.<name>" for special keys, as pynput prints them
+
+LETTERS = string.ascii_lowercase + "     ,."
+
+
+def synthetic_trace(seconds, seed=0, wpm=60):
+    # bursts of typing with capitals, corrections and the odd shortcut, separated by pauses
+    rng = np.random.default_rng(seed)
+    events = []
+    t = 0.0
+
+    def tap(t, name, hold=0.08):
+        events.append((t, "press", name))
+        events.append((t + hold, "release", name))
+
+    while t < seconds:
+        mean_gap = 60 / (wpm * 5) * rng.uniform(0.6, 1.5)
+        for _ in range(int(rng.integers(20, 600))):
+            t += min(rng.exponential(mean_gap), 3.0)
+            roll = rng.random()
+            if roll < 0.03:
+                tap(t, "Key.backspace")
+            elif roll < 0.04:
+                # ctrl+c, the c is not counted
+                events.append((t, "press", "Key.ctrl"))
+                tap(t + 0.05, "c")
+                events.append((t + 0.2, "release", "Key.ctrl"))
+                t += 0.2
+            elif roll < 0.08:
+                events.append((t - 0.03, "press", "Key.shift"))
+                tap(t, LETTERS[rng.integers(0, 26)].upper())
+                events.append((t + 0.1, "release", "Key.shift"))
+            else:
+                tap(t, LETTERS[rng.integers(0, len(LETTERS))].replace(" ", "Key.space"))
+        t += rng.exponential(20)
+
+    events.sort(key=lambda event: event[0])
+    return events
+
+
+def load_trace(path):
+    with open(path) as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    return [(event["t"], event["type"], event["key"]) for event in events]
+
+
+def save_trace(path, events):
+    with open(path, "w") as f:
+        for t, kind, name in events:
+            f.write(json.dumps({"t": t, "type": kind, "key": name}) + "\n")
+
+
+def record_trace(path):
+    # records real typing through pynput until esc is pressed
+    from pynput import keyboard
+
+    events = []
+    start = time.perf_counter()
+
+    def name(key):
+        return key.char if hasattr(key, "char") and key.char else str(key)
+
+    def on_press(key):
+        events.append((time.perf_counter() - start, "press", name(key)))
+        if key == keyboard.Key.esc:
+            return False
+
+    def on_release(key):
+        events.append((time.perf_counter() - start, "release", name(key)))
+
+    print("recording, press esc to stop")
+    with keyboard.Listener(on_press=on_press, on_release=on_release) as listener:
+        listener.join()
+    save_trace(path, events)
+    print(f"recorded {len(events)} events to {path}")
+
+
+def get_key(name, keys={}):
+    # one key object per name, like pynput's Key members, character keys are fresh objects as in pynput
+    if name.startswith("Key."):
+        if name not in keys:
+            keys[name] = Key.__members__.get(name[4:], Key.other)
+        return keys[name]
+    return KeyCode(name)
+
+
+class ScriptedClock:
+    # KeyboardHandler's clock, set to the trace time of each event before it is delivered
+    def __init__(self):
+        self.now = 0
+        self.wall_start = time.time_ns()
+
+    def __call__(self):
+        return self.now
+
+    def wall(self):
+        # the wall clock moves with the trace, not with the (sped up) replay
+        return self.wall_start + self.now
+
+
+def replay(handler, clock, events, speed):
+    # speed 0 delivers events as fast as possible, otherwise trace seconds per real second
+    press_ns = []
+    release_ns = []
+    max_depth = 0
+    counter = time.perf_counter_ns
+    first = events[0][0]
+    start = time.perf_counter()
+
+    for i, (t, kind, name) in enumerate(events):
+        if speed:
+            delay = start + (t - first) / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        key = get_key(name)
+        clock.now = int((t - first) * 1e9)
+        before = counter()
+        if kind == "press":
+            handler.on_press(key)
+            press_ns.append(counter() - before)
+        else:
+            handler.on_release(key)
+            release_ns.append(counter() - before)
+
+        if i % 256 == 0:
+            max_depth = max(max_depth, handler.writer.depth)
+
+    return time.perf_counter() - start, press_ns, release_ns, max_depth
+
+
+def check_bins(db_path):
+    # bins written live against the same archive re-binned offline
+    conn = sqlite3.connect(db_path)
+    written = dict(conn.execute("SELECT timestamp, value FROM log_data"))
+    reference = dict(rebin_key_times(iter_chunks(conn.cursor()), 5, RECORDING_THRESHOLD, MIN_RECORDINGS))
+    conn.close()
+
+    # the reference also closes the last bin, which the handler only does on the next key.
+    # archived times are whole ms, so an interval within a ms of RECORDING_THRESHOLD can land on
+    # the other side of it and move a bin by more than rounding
+    matched = sum(1 for ts, value in written.items() if reference.get(ts) == value)
+    diffs = [abs(reference[ts] - value) for ts, value in written.items() if ts in reference]
+    missing = sum(1 for ts in written if ts not in reference)
+    return {
+        "written": len(written),
+        "reference": len(reference),
+        "exact": matched,
+        "max_diff": max(diffs) if diffs else 0,
+        "not_in_reference": missing,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a keystroke trace through KeyboardHandler without pynput.")
+    parser.add_argument("--trace", help="JSON lines trace to replay, a synthetic one is generated otherwise")
+    parser.add_argument("--record", help="record real typing to this trace file (needs pynput) and exit")
+    parser.add_argument("--save", help="save the replayed trace to this file")
+    parser.add_argument("--seconds", type=float, default=3600, help="length of the synthetic trace")
+    parser.add_argument("--wpm", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--speed", type=float, default=0, help="0 replays as fast as possible, 1 in real time")
+    parser.add_argument("--db", help="database to write to, a temporary one by default")
+    args = parser.parse_args()
+
+    if args.record:
+        record_trace(args.record)
+        return
+
+    events = load_trace(args.trace) if args.trace else synthetic_trace(args.seconds, args.seed, args.wpm)
+    if args.save:
+        save_trace(args.save, events)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = args.db or os.path.join(tmp, "data.db")
+        init_database(db_path)
+
+        clock = ScriptedClock()
+        handler = KeyboardHandler(5, archive_intervals=True, db=DBWriter(db_path), clock=clock,
+                                  wall_clock=clock.wall)
+        handler.excluded_keys = EXCLUDED_KEYS
+
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            elapsed, press_ns, release_ns, max_depth = replay(handler, clock, events, args.speed)
+            drain_start = time.perf_counter()
+            handler.writer.stop()
+            drain = time.perf_counter() - drain_start
+            handler.db.close()
+
+        stats = handler.writer.stats()
+        bins = check_bins(db_path)
+
+    trace_seconds = events[-1][0] - events[0][0]
+    print(f"{len(events)} events covering {trace_seconds / 3600:.2f} h of typing, replayed in {elapsed:.2f}s "
+          f"({trace_seconds / elapsed:.0f}x real time)")
+    print(f"sustained {len(events) / elapsed:,.0f} events/s, writer drained {drain * 1e3:.1f} ms after the last event")
+    for name, samples in (("on_press", press_ns), ("on_release", release_ns)):
+        s = summarize_ns(samples)
+        print(f"{name:>10}: p50 {s['p50_ns']} ns, p99 {s['p99_ns']} ns, max {s['max_ns']} ns")
+    print(f"bins written {stats['rows_written']} in {stats['commits']} commits, dropped {stats['dropped']}, "
+          f"max queue depth {max_depth}")
+    print(f"commit latency mean {stats['mean_commit_latency'] * 1e3:.2f} ms, "
+          f"max {stats['max_commit_latency'] * 1e3:.2f} ms")
+    print(f"binning check: {bins['exact']}/{bins['written']} bins match the offline re-binning exactly, "
+          f"max difference {bins['max_diff']} WPM, {bins['not_in_reference']} without a reference bin")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import argparse
+import glob
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+from PyQt6 import sip
+
+from common import ROOT, BenchHost, get_app, summarize, wait_rendered
+from synthetic import DAY, generate
+
+from src.db_handlers import DBReader
+from src.views.SummaryGraph import SummaryGraph
+from src.views.WPMGraph import WPMGraph
+
+DEFAULT_DAYS = [1, 30, 365, 3650]
+STEPS = {
+    "1 min": 1,
+    "5 min": 5,
+    "15 min": 15,
+    "30 min": 30,
+    "60 min": 60,
+    "1 day": 24 * 60,
+    "1 week": 7 * 24 * 60,
+    "1 month": 30 * 24 * 60,
+    "1 year": 12 * 30 * 24 * 60,
+}
+SUMMARY_INTERVALS = ["day", "month", "year"]
+
+
+def pinned_end(now=None):
+    # the last second of the current UTC day: the history ends there and the graph is placed there,
+    # so every run measures the same windows over the same rows whenever its database was generated
+    now = int(now or time.time())
+    return now - now % DAY + DAY - 1
+
+
+def get_database(data_dir, days, seed, end):
+    # databases in data_dir are kept between runs, they take a while to generate for long histories;
+    # the name carries the end day, a database from an earlier day is replaced rather than reused
+    prefix = os.path.join(data_dir, f"synthetic_{days}d_seed{seed}")
+    db_path = f"{prefix}_{time.strftime('%Y-%m-%d', time.gmtime(end))}.db"
+    if not os.path.exists(db_path):
+        # with the WAL files and history snapshot next to them
+        for stale in glob.glob(glob.escape(prefix) + "_*.db*"):
+            shutil.rmtree(stale) if os.path.isdir(stale) else os.remove(stale)
+        start = time.perf_counter()
+        n_rows = generate(db_path, days, end=end, seed=seed)
+        print(f"generated {n_rows} rows over {days} days in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return db_path
+
+
+def count_rows(db_path):
+    conn = sqlite3.connect(db_path)
+    n_rows, first, last = conn.execute("SELECT COUNT(*), MIN(timestamp), MAX(timestamp) FROM log_data").fetchone()
+    conn.close()
+    return n_rows, first, last
+
+
+def measure(fn, repeat):
+    # the first call is reported on its own, it pays for cold caches
+    start = time.perf_counter()
+    fn()
+    first = time.perf_counter() - start
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    result = summarize(timings)
+    result["first_ms"] = first * 1e3
+    return result
+
+
+def set_step(graph, mult, end):
+    # what WPMGraph.update_mult does, without saving the config, scrolled to the end of the history
+    graph.bin_size = (graph.bin_size // graph.mult) * mult
+    graph.interval_size = (graph.interval_size // graph.mult) * mult
+    graph.mult = mult
+    graph.custom_interval = True
+    graph.interval_end = end + graph.bin_size
+
+
+def refresh_graph(graph):
+    # a refresh that has to load and draw, not one served from the prefetcher
+    graph.prefetcher.clear()
+    graph.rendered_window = None
+    graph.plot()
+    wait_rendered(graph.chart)
+
+
+def refresh_summary(summary):
+    # drawn even when the counts are unchanged
+    summary.dirty = True
+    summary.plot_summary()
+    summary.queries.wait("summary")
+    wait_rendered(summary.view)
+
+
+def bench_database(db_path, days, repeat, history_end):
+    app = get_app()
+    n_rows, first, last = count_rows(db_path)
+    db = DBReader(db_path)
+    host = BenchHost(db, mult=1)
+    graph = host.add(WPMGraph(host, db, bin_size=5))
+    summary = host.add(SummaryGraph(host, db))
+    app.processEvents()
+
+    results = []
+
+    def record(op, param, stats):
+        stats.update({"days": days, "rows": n_rows, "op": op, "param": param})
+        results.append(stats)
+        print(f"{days:>5}d {op:>18} {param:>8}: first {stats['first_ms']:9.2f} ms, "
+              f"p50 {stats['p50_ms']:9.2f} ms, max {stats['max_ms']:9.2f} ms", file=sys.stderr)
+
+    for label, mult in STEPS.items():
+        set_step(graph, mult, history_end)
+        key = graph.get_window_key()
+        time_bins = graph.get_time_bins(key)
+        start, end = float(time_bins[0]), float(time_bins[-1])
+        _, center, distance = graph.get_title(time_bins, mult)
+
+        record("read_data", label, measure(lambda: db.read_data(start, end), repeat))
+        record("get_max", label, measure(lambda: db.get_max(center, distance), repeat))
+        record("WPMGraph.plot", label, measure(lambda: refresh_graph(graph), repeat))
+
+    for interval in SUMMARY_INTERVALS:
+        summary.label_selection.blockSignals(True)
+        summary.label_selection.setCurrentText(interval)
+        summary.label_selection.blockSignals(False)
+        summary.slider.update_format(interval)
+        record("SummaryGraph.plot", interval, measure(lambda: refresh_summary(summary), repeat))
+
+    # the views' timers must be gone before their database is
+    graph.stop()
+    summary.stop()
+    host.queries.shutdown()
+    sip.delete(host)
+    db.close()
+    return results, {"days": days, "rows": n_rows, "first": first, "last": last, "end": history_end}
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline_path, results):
+    with open(baseline_path) as f:
+        baseline = {(r["days"], r["op"], r["param"]): r for r in json.load(f)["results"]}
+
+    print(f"{'days':>5} {'op':>18} {'param':>8} {'base p50':>10} {'p50':>10} {'ratio':>7}")
+    for result in results:
+        base = baseline.get((result["days"], result["op"], result["param"]))
+        if base is None:
+            continue
+        ratio = result["p50_ms"] / base["p50_ms"] if base["p50_ms"] else float("inf")
+        print(f"{result['days']:>5} {result['op']:>18} {result['param']:>8} "
+              f"{base['p50_ms']:10.2f} {result['p50_ms']:10.2f} {ratio:7.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time reads and redraws over synthetic databases of growing size.")
+    parser.add_argument("--days", type=int, nargs="+", default=DEFAULT_DAYS, help="history lengths to test")
+    parser.add_argument("--data-dir", help="keep generated databases here and reuse them between runs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write results as JSON to this file instead of stdout")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = args.data_dir or tmp
+        os.makedirs(data_dir, exist_ok=True)
+
+        end = pinned_end()
+        results = []
+        databases = []
+        for days in args.days:
+            db_path = get_database(data_dir, days, args.seed, end)
+            db_results, info = bench_database(db_path, days, args.repeat, end)
+            results.extend(db_results)
+            databases.append(info)
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "databases": databases,
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rollups import rebuild_rollups
+from src.utils import init_database
+
+MIN_BIN_SIZE = 5
+DAY = 60 * 60 * 24
+
+
+def day_rows(rng, day_start, sessions_per_day, base_wpm):
+    # a handful of typing sessions per day, each a run of 5 second bins with pauses in between
+    timestamps = []
+    for _ in range(rng.poisson(sessions_per_day)):
+        start = day_start + rng.integers(7 * 3600, 23 * 3600)
+        n_bins = int(rng.integers(12, 12 * 90))
+        bins = start - start % MIN_BIN_SIZE + np.arange(n_bins) * MIN_BIN_SIZE
+        timestamps.append(bins[rng.random(n_bins) < 0.7])
+
+    if not timestamps:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    timestamps = np.unique(np.concatenate(timestamps))
+    timestamps = timestamps[timestamps < day_start + DAY]
+    values = np.clip(rng.normal(base_wpm, 15, timestamps.size), 10, 250).round().astype(np.int64)
+    return timestamps, values
+
+
+def generate(db_path, days, end=None, sessions_per_day=6, seed=0, chunk_days=30):
+    # writes `days` of history ending at `end` into a fresh database at db_path
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    init_database(db_path)
+
+    rng = np.random.default_rng(seed)
+    end = int(end or time.time())
+    first_day = end - end % DAY - (days - 1) * DAY
+
+    conn = sqlite3.connect(db_path)
+    cur = conn.cursor()
+    n_rows = 0
+    base_wpm = 55.0
+    for chunk_start in range(0, days, chunk_days):
+        rows = []
+        for day in range(chunk_start, min(days, chunk_start + chunk_days)):
+            # slow drift so long ranges are not flat
+            base_wpm = float(np.clip(base_wpm + rng.normal(0.02, 0.4), 30, 120))
+            timestamps, values = day_rows(rng, first_day + day * DAY, sessions_per_day, base_wpm)
+            keep = timestamps <= end
+            rows.extend(zip(timestamps[keep].tolist(), values[keep].tolist()))
+        cur.executemany("INSERT OR IGNORE INTO log_data (timestamp, value) VALUES (?, ?)", rows)
+        n_rows += len(rows)
+
+    rebuild_rollups(cur)
+    conn.commit()
+    conn.close()
+    return n_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic TypeSpeedMonitor database.")
+    parser.add_argument("db_path")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--sessions-per-day", type=float, default=6)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    n_rows = generate(args.db_path, args.days, sessions_per_day=args.sessions_per_day, seed=args.seed)
+    print(f"wrote {n_rows} rows over {args.days} days to {args.db_path} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+from src import startup
+
 import sys
 
 from PyQt6.QtWidgets import QApplication
@@ -7,5 +9,6 @@ from App import App
 app = QApplication(sys.argv)
 window = App()
 window.show()
+startup.mark("window shown")
 
 sys.exit(app.exec())
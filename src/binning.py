@@ -0,0 +1,55 @@
+from collections import namedtuple
+
+import numpy as np
+
+BinnedSeries = namedtuple("BinnedSeries", ["mean", "count", "min", "max"])
+
+
+def _sorted_columns(timestamps, *columns):
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    columns = [np.asarray(column, dtype=np.float64) for column in columns]
+
+    if timestamps.size > 1 and np.any(timestamps[1:] < timestamps[:-1]):
+        order = np.argsort(timestamps, kind="stable")
+        timestamps = timestamps[order]
+        columns = [column[order] for column in columns]
+
+    return timestamps, columns
+
+
+def _reduce_bins(timestamps, edges, sums, counts, minimums, maximums):
+    # bins are half-open [edges[i], edges[i + 1]), rows outside the edges are ignored
+    edges = np.asarray(edges, dtype=np.float64)
+    n_bins = max(len(edges) - 1, 0)
+    mean = np.full(n_bins, np.nan)
+    minimum = np.full(n_bins, np.nan)
+    maximum = np.full(n_bins, np.nan)
+
+    bounds = np.searchsorted(timestamps, edges, side="left")
+    rows = np.diff(bounds)
+    nonempty = rows > 0
+    count = np.zeros(n_bins, dtype=np.int64)
+
+    if nonempty.any():
+        # consecutive non-empty bins are contiguous slices of the sorted window,
+        # so a single reduceat per statistic covers every bin
+        window = slice(bounds[0], bounds[-1])
+        starts = (bounds[:-1] - bounds[0])[nonempty]
+        count[nonempty] = rows[nonempty] if counts is None else np.add.reduceat(counts[window], starts)
+        mean[nonempty] = np.add.reduceat(sums[window], starts) / count[nonempty]
+        minimum[nonempty] = np.minimum.reduceat(minimums[window], starts)
+        maximum[nonempty] = np.maximum.reduceat(maximums[window], starts)
+
+    return BinnedSeries(mean, count, minimum, maximum)
+
+
+def bin_values(timestamps, values, edges):
+    timestamps, (values,) = _sorted_columns(timestamps, values)
+    return _reduce_bins(timestamps, edges, values, None, values, values)
+
+
+def bin_aggregates(timestamps, sums, counts, minimums, maximums, edges):
+    # pre-aggregated rows (e.g. rollup buckets) whose timestamps mark the bucket start
+    timestamps, (sums, counts, minimums, maximums) = _sorted_columns(
+        timestamps, sums, counts, minimums, maximums)
+    return _reduce_bins(timestamps, edges, sums, counts, minimums, maximums)
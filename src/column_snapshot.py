@@ -0,0 +1,258 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+# WPM is never negative and never near 65535, the top value stands for NULL
+NULL_VALUE = np.iinfo(np.uint16).max
+TIMESTAMP_DTYPE = np.dtype("<i8")
+VALUE_DTYPE = np.dtype("<u2")
+CHUNK_ROWS = 100_000
+# tail rows are folded into a new base file once there are this many of them
+COMPACT_ROWS = 256 * 1024
+
+# every reader of a snapshot in this process shares one lock for its files
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+def snapshot_dir(db_path):
+    return db_path + "-snapshot"
+
+
+def to_float(values):
+    # the series arrays used everywhere else: float values with NaN for NULL
+    result = values.astype(np.float64)
+    result[values == NULL_VALUE] = np.nan
+    return result
+
+
+def to_columns(rows):
+    block = np.array(rows, dtype=np.float64).reshape(-1, 2)
+    values = block[:, 1]
+    nulls = np.isnan(values)
+    values = np.clip(np.where(nulls, 0, values), 0, NULL_VALUE - 1).astype(VALUE_DTYPE)
+    values[nulls] = NULL_VALUE
+    return block[:, 0].astype(TIMESTAMP_DTYPE), values
+
+
+class ColumnSnapshot:
+    # log_data as sorted columns on disk: a memory-mapped base written in one go and an append-only tail,
+    # a new base gets a new version number so files another reader still has mapped are never rewritten
+    def __init__(self, directory):
+        self.directory = directory
+        with _locks_lock:
+            self.file_lock = _locks.setdefault(os.path.realpath(directory), threading.Lock())
+        self.version = None
+        self.base_timestamps = np.empty(0, dtype=TIMESTAMP_DTYPE)
+        self.base_values = np.empty(0, dtype=VALUE_DTYPE)
+        self.tail_timestamps = np.empty(0, dtype=TIMESTAMP_DTYPE)
+        self.tail_values = np.empty(0, dtype=VALUE_DTYPE)
+        self.rebuilds = 0
+        self.compactions = 0
+
+    @property
+    def size(self):
+        return len(self.base_timestamps) + len(self.tail_timestamps)
+
+    @property
+    def last_timestamp(self):
+        for timestamps in (self.tail_timestamps, self.base_timestamps):
+            if len(timestamps):
+                return int(timestamps[-1])
+        return None
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def read_meta(self):
+        try:
+            with open(self.path("meta.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def write_meta(self, meta):
+        tmp = self.path("meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self.path("meta.json"))
+
+    def sync(self, cur, generation):
+        # brings the snapshot up to date with log_data, rows are only ever appended after the last one
+        # and jobs that rewrite older history bump the generation, which rebuilds it
+        own_transaction = not cur.connection.in_transaction
+        if own_transaction:
+            cur.execute("BEGIN")
+        try:
+            with self.file_lock:
+                meta = self.read_meta()
+                if meta is None or meta["generation"] != generation:
+                    meta = self.rebuild(cur, generation, meta)
+                if meta["version"] != self.version:
+                    self.open(meta)
+                    if not self.matches(cur):
+                        # a different database at the same path
+                        meta = self.rebuild(cur, generation, meta)
+                        self.open(meta)
+                self.load_tail()
+                self.extend(cur)
+                if len(self.tail_timestamps) >= COMPACT_ROWS:
+                    self.open(self.compact(meta))
+        finally:
+            if own_transaction:
+                cur.execute("COMMIT")
+
+    def matches(self, cur):
+        if not len(self.base_timestamps):
+            return True
+        cur.execute("SELECT value FROM log_data WHERE timestamp = ?", (int(self.base_timestamps[-1]),))
+        row = cur.fetchone()
+        if row is None:
+            return False
+        value = NULL_VALUE if row[0] is None else min(max(row[0], 0), NULL_VALUE - 1)
+        return value == int(self.base_values[-1])
+
+    def rebuild(self, cur, generation, meta):
+        # streams log_data into a new base version without holding it in memory
+        os.makedirs(self.directory, exist_ok=True)
+        version = (meta["version"] if meta else 0) + 1
+        cur.execute("SELECT COUNT(*) FROM log_data")
+        n_rows = cur.fetchone()[0]
+        if n_rows:
+            timestamps, values = self.create_base(version, n_rows)
+            cur.execute("SELECT timestamp, value FROM log_data ORDER BY timestamp")
+            written = 0
+            while True:
+                rows = cur.fetchmany(CHUNK_ROWS)
+                if not rows:
+                    break
+                timestamps[written:written + len(rows)], values[written:written + len(rows)] = to_columns(rows)
+                written += len(rows)
+            timestamps.flush()
+            values.flush()
+            del timestamps, values
+
+        meta = {"generation": generation, "version": version, "rows": n_rows}
+        self.write_meta(meta)
+        self.remove_old(version)
+        self.rebuilds += 1
+        return meta
+
+    def compact(self, meta):
+        # base and tail copied into a new base version, chunk by chunk
+        version = meta["version"] + 1
+        n_rows = self.size
+        timestamps, values = self.create_base(version, n_rows)
+        written = 0
+        for source_timestamps, source_values in ((self.base_timestamps, self.base_values),
+                                                 (self.tail_timestamps, self.tail_values)):
+            for start in range(0, len(source_timestamps), CHUNK_ROWS):
+                chunk = slice(start, start + CHUNK_ROWS)
+                n = len(source_timestamps[chunk])
+                timestamps[written:written + n] = source_timestamps[chunk]
+                values[written:written + n] = source_values[chunk]
+                written += n
+        timestamps.flush()
+        values.flush()
+        del timestamps, values
+
+        meta = {"generation": meta["generation"], "version": version, "rows": n_rows}
+        self.write_meta(meta)
+        self.remove_old(version)
+        self.compactions += 1
+        return meta
+
+    def create_base(self, version, n_rows):
+        open_memmap = np.lib.format.open_memmap
+        return (open_memmap(self.path(f"timestamps-{version}.npy"), mode="w+", dtype=TIMESTAMP_DTYPE, shape=(n_rows,)),
+                open_memmap(self.path(f"values-{version}.npy"), mode="w+", dtype=VALUE_DTYPE, shape=(n_rows,)))
+
+    def remove_old(self, version):
+        # files of older versions, another reader may still have them mapped, which windows refuses to delete
+        keep = {f"timestamps-{version}.npy", f"values-{version}.npy",
+                f"tail-{version}.timestamps", f"tail-{version}.values", "meta.json"}
+        for name in os.listdir(self.directory):
+            if name not in keep:
+                try:
+                    os.remove(self.path(name))
+                except OSError:
+                    pass
+
+    def open(self, meta):
+        self.version = meta["version"]
+        if meta["rows"]:
+            self.base_timestamps = np.load(self.path(f"timestamps-{self.version}.npy"), mmap_mode="r")
+            self.base_values = np.load(self.path(f"values-{self.version}.npy"), mmap_mode="r")
+        else:
+            self.base_timestamps = np.empty(0, dtype=TIMESTAMP_DTYPE)
+            self.base_values = np.empty(0, dtype=VALUE_DTYPE)
+        self.tail_timestamps = np.empty(0, dtype=TIMESTAMP_DTYPE)
+        self.tail_values = np.empty(0, dtype=VALUE_DTYPE)
+
+    def tail_paths(self):
+        return self.path(f"tail-{self.version}.timestamps"), self.path(f"tail-{self.version}.values")
+
+    def load_tail(self):
+        # picks up rows other readers appended, a torn append is cut back to whole rows
+        timestamps_path, values_path = self.tail_paths()
+        sizes = [os.path.getsize(p) if os.path.exists(p) else 0 for p in (timestamps_path, values_path)]
+        n_rows = min(sizes[0] // TIMESTAMP_DTYPE.itemsize, sizes[1] // VALUE_DTYPE.itemsize)
+        for p, size, dtype in ((timestamps_path, sizes[0], TIMESTAMP_DTYPE), (values_path, sizes[1], VALUE_DTYPE)):
+            if size != n_rows * dtype.itemsize:
+                with open(p, "r+b") as f:
+                    f.truncate(n_rows * dtype.itemsize)
+
+        loaded = len(self.tail_timestamps)
+        if n_rows > loaded:
+            self.tail_timestamps = np.concatenate([self.tail_timestamps, np.fromfile(
+                timestamps_path, dtype=TIMESTAMP_DTYPE, count=n_rows - loaded, offset=loaded * TIMESTAMP_DTYPE.itemsize)])
+            self.tail_values = np.concatenate([self.tail_values, np.fromfile(
+                values_path, dtype=VALUE_DTYPE, count=n_rows - loaded, offset=loaded * VALUE_DTYPE.itemsize)])
+
+    def extend(self, cur):
+        last = self.last_timestamp
+        cur.execute(
+            "SELECT timestamp, value FROM log_data WHERE timestamp > ? ORDER BY timestamp",
+            (last if last is not None else -2 ** 63,)
+        )
+        rows = cur.fetchall()
+        if not rows:
+            return
+
+        timestamps, values = to_columns(rows)
+        timestamps_path, values_path = self.tail_paths()
+        with open(timestamps_path, "ab") as f:
+            f.write(timestamps.tobytes())
+        with open(values_path, "ab") as f:
+            f.write(values.tobytes())
+        self.tail_timestamps = np.concatenate([self.tail_timestamps, timestamps])
+        self.tail_values = np.concatenate([self.tail_values, values])
+
+    def series(self, start, end):
+        # rows with start <= timestamp <= end as (int64 timestamps, uint16 values),
+        # views into the mapped base unless the range reaches into the tail
+        start, end = np.int64(np.ceil(start)), np.int64(np.floor(end))
+        parts = []
+        for timestamps, values in ((self.base_timestamps, self.base_values),
+                                   (self.tail_timestamps, self.tail_values)):
+            lo = np.searchsorted(timestamps, start, side="left")
+            hi = np.searchsorted(timestamps, end, side="right")
+            if hi > lo:
+                parts.append((timestamps[lo:hi], values[lo:hi]))
+
+        if not parts:
+            return np.empty(0, dtype=TIMESTAMP_DTYPE), np.empty(0, dtype=VALUE_DTYPE)
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+    def stats(self):
+        return {
+            "version": self.version,
+            "base_rows": len(self.base_timestamps),
+            "tail_rows": len(self.tail_timestamps),
+            "rebuilds": self.rebuilds,
+            "compactions": self.compactions,
+        }
@@ -0,0 +1,30 @@
+from PyQt6.QtCore import QObject, QTimer, Qt, pyqtSignal
+
+POLL_INTERVAL = 1000  # ms, catches writers in other processes
+
+
+class DataNotifier(QObject):
+    dataChanged = pyqtSignal()
+    committed = pyqtSignal()
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.version = db.data_version()
+
+        # writer threads emit committed, the check itself always runs on the GUI thread
+        self.committed.connect(self.check, Qt.ConnectionType.QueuedConnection)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.check)
+        self.timer.start(POLL_INTERVAL)
+
+    def notify(self):
+        # safe to call from any thread
+        self.committed.emit()
+
+    def check(self):
+        version = self.db.data_version()
+        if version != self.version:
+            self.version = version
+            self.dataChanged.emit()
@@ -1,55 +1,342 @@
 import sqlite3
-from src.utils import get_db_path
+import threading
+import time
+
+import numpy as np
+
+from src import perf
+from src.column_snapshot import NULL_VALUE, ColumnSnapshot, snapshot_dir, to_float
+from src.histogram import QUANTILES, count_quantiles
+from src.histogram_index import HistogramIndex
+from src.range_max import RangeMaxIndex
+from src.rollups import HISTOGRAM_LEVELS, HISTOGRAM_MAX, histogram_table, rollup_table, update_rollups
+from src.series_cache import SeriesCache
+from src.utils import get_db_path, read_generation
+
+CACHE_DAYS = 31
+CACHE_MAX_BYTES = 16 * 1024 * 1024
+# the WAL file is cut back to this size whenever a checkpoint has emptied it
+JOURNAL_SIZE_LIMIT = 1024 * 1024
 
 
 class DBWriter:
-    def __init__(self):
-        db_path = get_db_path()
+    def __init__(self, db_path=None):
+        db_path = db_path or get_db_path()
         self.conn = sqlite3.connect(db_path, check_same_thread=False)
 
         self.conn.execute("PRAGMA journal_mode=WAL")
         self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(f"PRAGMA journal_size_limit={JOURNAL_SIZE_LIMIT}")
 
         self.cur = self.conn.cursor()
 
     def insert_data(self, timestamp, value):
-        self.cur.execute(
-            "INSERT OR IGNORE INTO log_data (timestamp, value) VALUES (?, ?)",
-            (timestamp, value)
-        )
-        self.conn.commit()
+        self.insert_many([(timestamp, value)])
+
+    def insert_many(self, rows, intervals=()):
+        # one transaction for the whole batch, intervals are (start_ms, blob) archive chunks
+        with perf.timed("db.commit"):
+            try:
+                self.cur.executemany(
+                    "INSERT OR IGNORE INTO interval_archive (start_ms, intervals) VALUES (?, ?)",
+                    intervals
+                )
+                inserted = []
+                for timestamp, value in rows:
+                    self.cur.execute(
+                        "INSERT OR IGNORE INTO log_data (timestamp, value) VALUES (?, ?)",
+                        (timestamp, value)
+                    )
+                    if self.cur.rowcount > 0:
+                        inserted.append((timestamp, value))
+
+                update_rollups(self.cur, inserted)
+                self.conn.commit()
+            except sqlite3.Error:
+                self.conn.rollback()
+                raise
 
     def close(self):
         print("Closing database writing connection...")
         self.conn.close()
 
+def add_counts(*counts):
+    # element-wise sum of count vectors of different lengths
+    result = np.zeros(max(len(c) for c in counts), dtype=np.int64)
+    for c in counts:
+        result[:len(c)] += c
+    return result
+
+
+class ReaderState:
+    # the cache and indexes behind a reader, one per process however many connections read through it
+    def __init__(self, cache_days=CACHE_DAYS, cache_max_bytes=CACHE_MAX_BYTES):
+        self.cache = SeriesCache(cache_days * 24 * 60 * 60, cache_max_bytes)
+        self.generation = None
+
+        # hourly maxima for get_max, kept current from the same tail reads as the cache,
+        # jobs that rewrite older history bump the generation so both get rebuilt;
+        # rollup_hour is the persistent part, the tree over it takes ~30 ms for 10 years to build
+        self.range_max = RangeMaxIndex()
+        # per-day WPM counts with prefix sums for read_histogram, maintained the same way
+        self.histogram_index = HistogramIndex()
+
+        # always taken after the reader's own lock
+        self.lock = threading.RLock()
+
+
 class DBReader():
-    def __init__(self):
-        db_path = get_db_path()
-        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+    def __init__(self, db_path=None, cache_days=CACHE_DAYS, cache_max_bytes=CACHE_MAX_BYTES, state=None):
+        self.db_path = db_path or get_db_path()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
 
         self.conn.execute("PRAGMA journal_mode=WAL")
         self.conn.execute("PRAGMA query_only=1")
 
         self.cur = self.conn.cursor()
 
+        # readers made with share() use the cache and indexes of this one
+        self.owns_state = state is None
+        self.state = state or ReaderState(cache_days, cache_max_bytes)
+        self.cache = self.state.cache
+        self.range_max = self.state.range_max
+        self.histogram_index = self.state.histogram_index
+        # data_version is per connection, so each reader keeps the last one it saw
+        self.cached_version = None
+
+        # all of log_data as memory-mapped columns, serves every read the cache cannot;
+        # the mapped base is shared through the page cache, so every reader keeps its own
+        self.snapshot = ColumnSnapshot(snapshot_dir(self.db_path))
+        self.snapshot_version = None
+
+        # the connection is shared with background loaders
+        self.lock = threading.RLock()
+
+    def share(self):
+        # another connection over the same cache and indexes, for worker threads
+        return DBReader(self.db_path, state=self.state)
+
+    @property
+    def generation(self):
+        return self.state.generation
+
+    def data_version(self):
+        # changes whenever another connection commits to the database
+        with self.lock:
+            self.cur.execute("PRAGMA data_version")
+            return self.cur.fetchone()[0]
+
+    def sync_cache(self):
+        # rows newer than the cache are fetched by whichever reader notices them first,
+        # the others then find nothing past last_timestamp
+        with self.lock, self.state.lock, perf.timed("db.sync_cache"):
+            state = self.state
+            version = self.data_version()
+            if version != self.cached_version:
+                generation = read_generation(self.cur)
+                if generation != state.generation:
+                    # history was rewritten, start over from the database
+                    state.generation = generation
+                    self.cache.clear()
+
+            if self.cache.start is None:
+                # one snapshot for the cache and both indexes, so later tail rows are counted exactly once
+                self.cur.execute("BEGIN")
+                try:
+                    start = int(time.time()) - self.cache.span
+                    self.cur.execute(
+                        "SELECT timestamp, value FROM log_data WHERE timestamp >= ? ORDER BY timestamp",
+                        (start,)
+                    )
+                    self.cache.reset(start, self.cur.fetchall())
+                    self.build_range_max()
+                    self.build_histogram_index()
+                finally:
+                    self.cur.execute("COMMIT")
+            elif version != self.cached_version:
+                last = self.cache.last_timestamp
+                self.cur.execute(
+                    "SELECT timestamp, value FROM log_data WHERE timestamp > ? ORDER BY timestamp",
+                    (last if last is not None else self.cache.start - 1,)
+                )
+                rows = self.cur.fetchall()
+                self.cache.append(rows)
+                for timestamp, value in rows:
+                    self.range_max.update(timestamp, value)
+                    if not self.histogram_index.add(timestamp, value):
+                        self.build_histogram_index()
+            else:
+                self.cache.evict()
+            self.cached_version = version
+
+    def get_generation(self):
+        with self.lock, self.state.lock:
+            self.sync_cache()
+            return self.generation
+
+    def synced_snapshot(self):
+        # only brought up to date when a read misses the cache, so views of recent history never pay for it
+        with self.lock:
+            if self.snapshot_version != self.cached_version:
+                with perf.timed("db.sync_snapshot"):
+                    self.snapshot.sync(self.cur, self.generation)
+                self.snapshot_version = self.cached_version
+            return self.snapshot
+
+    def prepare_snapshot(self):
+        with self.lock:
+            self.sync_cache()
+            return self.synced_snapshot().stats()
+
+    def build_range_max(self):
+        with self.lock:
+            self.cur.execute(f"SELECT bucket, value_max FROM {rollup_table('hour')} WHERE value_max IS NOT NULL")
+            rows = np.array(self.cur.fetchall(), dtype=np.int64).reshape(-1, 2)
+            self.range_max.build(rows[:, 0], rows[:, 1])
+
+    def build_histogram_index(self):
+        with self.lock:
+            self.cur.execute(f"SELECT bucket, value, count FROM {histogram_table('day')}")
+            rows = np.array(self.cur.fetchall(), dtype=np.int64).reshape(-1, 3)
+            self.histogram_index.build(rows[:, 0], rows[:, 1], rows[:, 2])
+
+    def raw_counts(self, start, end):
+        # WPM counts over the raw rows, only used for the partial hours at either end of a range;
+        # like read_series, the shared lock is only held for the cache lookup
+        with self.state.lock:
+            cached = self.cache.lookup(start, end, count=False)
+        if cached is None:
+            _, values = self.synced_snapshot().series(start, end)
+            return np.bincount(np.minimum(values[values != NULL_VALUE], HISTOGRAM_MAX))
+
+        _, values = cached
+        values = values[~np.isnan(values) & (values >= 0)].astype(np.int64)
+        return np.bincount(np.minimum(values, HISTOGRAM_MAX))
+
+    def hour_counts(self, start, end):
+        # whole hours from histogram_hour, the partial hours at the edges from raw rows
+        if start > end:
+            return np.zeros(0, dtype=np.int64)
+        hour = HISTOGRAM_LEVELS["hour"]
+        first_hour = -(-start // hour)
+        end_hour = (end + 1) // hour
+        if first_hour >= end_hour:
+            return self.raw_counts(start, end)
+
+        self.cur.execute(f"""
+            SELECT MIN(value, ?) AS clamped, SUM(count) FROM {histogram_table('hour')}
+            WHERE bucket >= ? AND bucket < ?
+            GROUP BY clamped
+        """, (HISTOGRAM_MAX, first_hour * hour, end_hour * hour))
+        rows = np.array(self.cur.fetchall(), dtype=np.int64).reshape(-1, 2)
+        counts = np.bincount(rows[:, 0], weights=rows[:, 1]).astype(np.int64)
+        return add_counts(counts, self.raw_counts(start, first_hour * hour - 1),
+                          self.raw_counts(end_hour * hour, end))
+
+    def read_histogram(self, start, end):
+        # counts[v] = rows with value v in [start, end]: whole days from the prefix sums,
+        # the partial days at the edges from hours and raw rows, so the cost does not grow with the range
+        with self.lock, perf.timed("db.read_histogram"):
+            start, end = int(np.ceil(start)), int(np.floor(end))
+            day = self.histogram_index.block
+            first_day = -(-start // day)
+            end_day = (end + 1) // day
+            # the shared lock covers the index, the edges are read without it
+            with self.state.lock:
+                self.sync_cache()
+                days = self.histogram_index.counts(first_day, end_day) if first_day < end_day else None
+            if days is None:
+                return self.hour_counts(start, end)
+
+            return add_counts(days, self.hour_counts(start, first_day * day - 1),
+                              self.hour_counts(end_day * day, end))
+
+    def read_quantiles(self, start, end, quantiles=QUANTILES):
+        # {q: WPM} over [start, end], exact because WPM is an integer: the counts come from read_histogram
+        with self.lock, perf.timed("db.read_quantiles"):
+            return count_quantiles(self.read_histogram(start, end), quantiles)
+
+    def raw_max(self, start, end):
+        # max over the raw rows, only used for the partial hours at either end of a range
+        with self.state.lock:
+            cached = self.cache.lookup(start, end, count=False)
+        if cached is not None:
+            _, values = cached
+            values = values[~np.isnan(values)]
+            return int(values.max()) if values.size else None
+
+        _, values = self.synced_snapshot().series(start, end)
+        values = values[values != NULL_VALUE]
+        return int(values.max()) if values.size else None
+
+    def read_series(self, start, end):
+        # (timestamps, values) arrays, values are float with NaN for NULL
+        with self.lock, perf.timed("db.read_series"):
+            # the shared lock only covers the cache, a miss reads the snapshot without it
+            with self.state.lock:
+                self.sync_cache()
+                cached = self.cache.lookup(start, end)
+            if cached is not None:
+                return cached
+
+            timestamps, values = self.synced_snapshot().series(start, end)
+            return timestamps, to_float(values)
+
     def read_data(self, start, end):
-        self.cur.execute(
-            "SELECT * FROM log_data WHERE timestamp BETWEEN ? AND ?",
-            (start, end)
-        )
-        return self.cur.fetchall()
+        with self.lock, perf.timed("db.read_data"):
+            with self.state.lock:
+                self.sync_cache()
+                cached = self.cache.lookup(start, end)
+            if cached is not None:
+                timestamps, values = cached
+                return [(ts, None if value != value else int(value))
+                        for ts, value in zip(timestamps.tolist(), values.tolist())]
+
+            timestamps, values = self.synced_snapshot().series(start, end)
+            return [(ts, None if value == NULL_VALUE else value)
+                    for ts, value in zip(timestamps.tolist(), values.tolist())]
+
+    def read_rollup(self, level, start, end):
+        with self.lock, perf.timed("db.read_rollup"):
+            self.cur.execute(f"""
+                SELECT bucket, value_sum, value_count, value_min, value_max
+                FROM {rollup_table(level)}
+                WHERE bucket >= ? AND bucket < ?
+            """, (start, end))
+            return self.cur.fetchall()
 
     def get_max(self, point, distance):
-        self.cur.execute("""
-            SELECT MAX(value)
-            FROM log_data
-            WHERE timestamp BETWEEN ? AND ?
-        """, (point - distance, point + distance))
-        result = self.cur.fetchone()
-        return result[0] if result and result[0] is not None else 60
+        with self.lock, perf.timed("db.get_max"):
+            start, end = point - distance, point + distance
 
-    def close(self):
-        print("Closing database reading connection...")
-        self.conn.close()
+            # whole hours come from the index, the partial hours at the edges from raw rows,
+            # which are read without the shared lock
+            block = self.range_max.block
+            first_block = -(-int(np.ceil(start)) // block)
+            end_block = (int(np.floor(end)) + 1) // block
+            with self.state.lock:
+                self.sync_cache()
+                hours = self.range_max.query(first_block, end_block - 1) if first_block < end_block else None
+            if first_block >= end_block:
+                result = self.raw_max(start, end)
+            else:
+                candidates = [
+                    hours,
+                    self.raw_max(start, first_block * block - 1),
+                    self.raw_max(end_block * block, end),
+                ]
+                candidates = [c for c in candidates if c is not None]
+                result = max(candidates) if candidates else None
+            return result if result is not None else 60
 
+    def cache_stats(self):
+        with self.state.lock:
+            return self.cache.stats()
+
+    def close(self):
+        with self.lock:
+            print("Closing database reading connection...")
+            if self.owns_state:
+                print("Reader cache stats:", self.cache_stats())
+            print("Reader snapshot stats:", self.snapshot.stats())
+            self.conn.close()
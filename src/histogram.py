@@ -0,0 +1,61 @@
+import numpy as np
+
+QUANTILES = (0.1, 0.5, 0.9)
+
+
+def count_quantiles(counts, quantiles=QUANTILES):
+    # counts[v] = how often value v was seen; the smallest v with at least q of all values at or below it,
+    # the same as np.quantile(values, q, method="inverted_cdf"), None without any values
+    cumulative = np.cumsum(counts)
+    total = int(cumulative[-1]) if len(cumulative) else 0
+    if not total:
+        return {q: None for q in quantiles}
+    # the small offset keeps 0.7 * 10 = 7.000000000000001 from rounding up to 8
+    ranks = [max(int(np.ceil(q * total - 1e-9)), 1) for q in quantiles]
+    return {q: int(v) for q, v in zip(quantiles, np.searchsorted(cumulative, ranks, side="left"))}
+
+
+class WPMHistogram:
+    # running count of every integer WPM value seen in one time range
+    def __init__(self):
+        self.reset(None, None)
+
+    def reset(self, start, end):
+        self.start = start
+        self.end = end
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    @property
+    def range(self):
+        return self.start, self.end
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    @property
+    def distinct(self):
+        return int(np.count_nonzero(self.counts))
+
+    @property
+    def min_value(self):
+        return int(np.flatnonzero(self.counts)[0])
+
+    @property
+    def max_value(self):
+        return int(np.flatnonzero(self.counts)[-1])
+
+    def quantiles(self, quantiles=QUANTILES):
+        return count_quantiles(self.counts, quantiles)
+
+    def add_counts(self, counts):
+        if len(counts) > len(self.counts):
+            self.counts = np.pad(self.counts, (0, len(counts) - len(self.counts)))
+        self.counts[:len(counts)] += counts
+
+    def binned(self, bin_width):
+        # same result as np.histogram(values, bins=np.arange(min, max + bin_width, bin_width))
+        lo, hi = self.min_value, self.max_value
+        edges = np.arange(lo, hi + bin_width, bin_width)
+        window = self.counts[lo:edges[-1] + 1]
+        return np.add.reduceat(window, edges[:-1] - lo), edges
@@ -0,0 +1,80 @@
+import numpy as np
+
+from src.rollups import HISTOGRAM_MAX
+
+BLOCK = 60 * 60 * 24  # one row per day, matching histogram_day
+
+
+class HistogramIndex:
+    # prefix sums of per-block WPM counts: cumulative[i, v] counts value v over the first i blocks
+    def __init__(self, block=BLOCK):
+        self.block = block
+        self.base = None
+        # cumulative is a view into storage, which grows by doubling like the series cache,
+        # rows and columns past it are kept at zero
+        self.storage = np.zeros((1, 0), dtype=np.int64)
+        self.n_rows = 1
+        self.width = 0
+
+    @property
+    def cumulative(self):
+        return self.storage[:self.n_rows, :self.width]
+
+    @property
+    def n_blocks(self):
+        return self.n_rows - 1
+
+    def build(self, buckets, values, counts):
+        blocks = np.asarray(buckets, dtype=np.int64) // self.block
+        values = np.minimum(np.asarray(values, dtype=np.int64), HISTOGRAM_MAX)
+        if not blocks.size:
+            self.base = None
+            self.storage = np.zeros((1, 0), dtype=np.int64)
+            self.n_rows, self.width = 1, 0
+            return
+
+        self.base = int(blocks.min())
+        dense = np.zeros((int(blocks.max()) - self.base + 1, int(values.max()) + 1), dtype=np.int64)
+        np.add.at(dense, (blocks - self.base, values), np.asarray(counts, dtype=np.int64))
+        self.storage = np.zeros((len(dense) + 1, dense.shape[1]), dtype=np.int64)
+        np.cumsum(dense, axis=0, out=self.storage[1:])
+        self.n_rows, self.width = self.storage.shape
+
+    def reserve(self, n_rows, width):
+        rows, columns = self.storage.shape
+        if n_rows > rows or width > columns:
+            storage = np.zeros((max(n_rows, 2 * rows) if n_rows > rows else rows,
+                                min(max(width, 2 * columns), HISTOGRAM_MAX + 1) if width > columns else columns),
+                               dtype=np.int64)
+            storage[:self.n_rows, :self.width] = self.cumulative
+            self.storage = storage
+
+    def add(self, timestamp, value):
+        # rows arrive at the tail, so only the last few prefix rows change;
+        # False means the row is older than the index and it has to be rebuilt
+        if value is None or value < 0:
+            return True
+        value = min(int(value), HISTOGRAM_MAX)
+        block = int(timestamp) // self.block
+        if self.base is None:
+            self.base = block
+        elif block < self.base:
+            return False
+
+        row = block - self.base + 1
+        self.reserve(row + 1, value + 1)
+        if row >= self.n_rows:
+            # days without typing repeat the last prefix row
+            self.storage[self.n_rows:row + 1] = self.storage[self.n_rows - 1]
+            self.n_rows = row + 1
+        self.width = max(self.width, value + 1)
+        self.storage[row:self.n_rows, value] += 1
+        return True
+
+    def counts(self, first_block, end_block):
+        # counts per value over blocks first_block..end_block - 1, one subtraction whatever the length
+        if self.base is None:
+            return np.zeros(0, dtype=np.int64)
+        lo = min(max(first_block - self.base, 0), self.n_blocks)
+        hi = min(max(end_block - self.base, 0), self.n_blocks)
+        return self.cumulative[max(hi, lo)] - self.cumulative[lo]
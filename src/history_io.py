@@ -0,0 +1,269 @@
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import struct
+import time
+
+import numpy as np
+
+from src.rollups import refresh_buckets
+from src.utils import bump_generation, get_db_path
+
+CHUNK_ROWS = 50_000
+
+# tables holding recorded data, everything else is derived from log_data and rebuilt on import
+SOURCE_TABLES = ["log_data", "interval_archive"]
+FORMATS = {"csv": ".csv", "columnar": ".tscol"}
+
+COLUMNAR_MAGIC = b"TSMCOL1\n"
+CHUNK_HEADER = struct.Struct("<I")
+
+
+def exportable_tables(cur):
+    # recorded data plus every aggregate table, db_meta only matters to the database it is in
+    cur.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")
+    return [name for (name,) in cur.fetchall() if name != "db_meta"]
+
+
+def table_columns(cur, table):
+    # (name, kind) with kind one of "int", "real", "blob" from the declared type
+    cur.execute(f"PRAGMA table_info({table})")
+    columns = []
+    for _, name, declared, _, _, _ in cur.fetchall():
+        declared = declared.upper()
+        kind = "blob" if "BLOB" in declared else "real" if "REAL" in declared else "int"
+        columns.append((name, kind))
+    return columns
+
+
+def iter_chunks(cur, table, columns):
+    cur.execute(f"SELECT {', '.join(name for name, _ in columns)} FROM {table} ORDER BY 1")
+    while True:
+        rows = cur.fetchmany(CHUNK_ROWS)
+        if not rows:
+            return
+        yield rows
+
+
+# CSV: a header row, NULL as an empty field, blobs as hex
+
+def write_csv(path, columns, chunks):
+    blobs = [i for i, (_, kind) in enumerate(columns) if kind == "blob"]
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow([name for name, _ in columns])
+        for rows in chunks:
+            if blobs:
+                rows = [[value.hex() if i in blobs and value is not None else value for i, value in enumerate(row)]
+                        for row in rows]
+            writer.writerows(rows)
+            yield len(rows)
+
+
+def read_csv(path):
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        names = next(reader)
+        yield names
+        rows = []
+        for record in reader:
+            rows.append([None if field == "" else field for field in record])
+            if len(rows) >= CHUNK_ROWS:
+                yield rows
+                rows = []
+        if rows:
+            yield rows
+
+
+def convert_csv_rows(rows, kinds):
+    convert = {"int": int, "real": float, "blob": bytes.fromhex}
+    return [tuple(None if value is None else convert[kind](value) for value, kind in zip(row, kinds))
+            for row in rows]
+
+
+# columnar: magic, one JSON header line, then chunks of [row count, per column: null mask, data];
+# int and real columns are little-endian 8 byte arrays, blobs are uint32 lengths followed by the bytes
+
+def write_columnar(path, table, columns, chunks):
+    with open(path, "wb") as f:
+        f.write(COLUMNAR_MAGIC)
+        f.write(json.dumps({"table": table, "columns": columns}).encode() + b"\n")
+        for rows in chunks:
+            f.write(CHUNK_HEADER.pack(len(rows)))
+            for (_, kind), values in zip(columns, zip(*rows)):
+                nulls = [value is None for value in values] if None in values else None
+                f.write(np.zeros(len(values), dtype=np.uint8).tobytes() if nulls is None
+                        else np.array(nulls, dtype=np.uint8).tobytes())
+                if kind == "blob":
+                    blobs = [value or b"" for value in values]
+                    f.write(np.array([len(b) for b in blobs], dtype="<u4").tobytes())
+                    f.write(b"".join(blobs))
+                else:
+                    dtype = "<f8" if kind == "real" else "<i8"
+                    if nulls is not None:
+                        values = [0 if value is None else value for value in values]
+                    f.write(np.array(values, dtype=dtype).tobytes())
+            yield len(rows)
+        f.write(CHUNK_HEADER.pack(0))
+
+
+def read_columnar(path):
+    with open(path, "rb") as f:
+        if f.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ValueError(f"{path} is not a columnar export")
+        header = json.loads(f.readline())
+        yield header
+
+        while True:
+            (n_rows,) = CHUNK_HEADER.unpack(f.read(CHUNK_HEADER.size))
+            if not n_rows:
+                return
+            columns = []
+            for _, kind in header["columns"]:
+                nulls = np.frombuffer(f.read(n_rows), dtype=np.uint8).astype(bool)
+                if kind == "blob":
+                    lengths = np.frombuffer(f.read(4 * n_rows), dtype="<u4")
+                    data = f.read(int(lengths.sum()))
+                    ends = np.cumsum(lengths).tolist()
+                    values = [data[end - length:end] for end, length in zip(ends, lengths.tolist())]
+                else:
+                    values = np.frombuffer(f.read(8 * n_rows), dtype="<f8" if kind == "real" else "<i8").tolist()
+                if nulls.any():
+                    values = [None if null else value for value, null in zip(values, nulls.tolist())]
+                columns.append(values)
+            yield list(zip(*columns))
+
+
+def export_history(directory, fmt="columnar", tables=None, db_path=None):
+    # one file per table, returns {table: (rows, seconds)}
+    os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db_path or get_db_path())
+    cur = conn.cursor()
+    results = {}
+    try:
+        for table in tables or exportable_tables(cur):
+            start = time.perf_counter()
+            columns = table_columns(cur, table)
+            path = os.path.join(directory, table + FORMATS[fmt])
+            chunks = iter_chunks(cur, table, columns)
+            written = write_csv(path, columns, chunks) if fmt == "csv" \
+                else write_columnar(path, table, columns, chunks)
+            results[table] = (sum(written), time.perf_counter() - start)
+    finally:
+        conn.close()
+    return results
+
+
+def import_history(directory, db_path=None):
+    # recorded tables are merged in, rows already in the database win; aggregates are recomputed
+    # from the merged log_data rather than imported, so they can never disagree with it.
+    # files are staged in temp tables first and published in one transaction with the refreshed
+    # aggregates and the generation bump, so a failed import leaves the database as it was
+    conn = sqlite3.connect(db_path or get_db_path(), timeout=30)
+    cur = conn.cursor()
+    results = {}
+    try:
+        staged = []
+        for table in SOURCE_TABLES:
+            for fmt, extension in FORMATS.items():
+                path = os.path.join(directory, table + extension)
+                if os.path.exists(path):
+                    results[table] = import_table(cur, table, path, fmt)
+                    if table not in staged:
+                        staged.append(table)
+        # only temp tables were written so far
+        conn.commit()
+
+        start = time.perf_counter()
+        cur.execute("BEGIN IMMEDIATE")
+        added = 0
+        if "log_data" in staged:
+            # only the buckets of rows the database did not have yet are recomputed, like a merge
+            cur.execute("DROP TABLE IF EXISTS temp.import_changes")
+            cur.execute(f"""
+                CREATE TEMP TABLE import_changes AS
+                SELECT DISTINCT s.timestamp AS timestamp FROM temp.{staging_table('log_data')} s
+                LEFT JOIN main.log_data l ON l.timestamp = s.timestamp
+                WHERE l.timestamp IS NULL
+            """)
+            added = cur.execute("SELECT COUNT(*) FROM temp.import_changes").fetchone()[0]
+        for table in staged:
+            names = ", ".join(name for name, _ in table_columns(cur, table))
+            cur.execute(f"INSERT OR IGNORE INTO main.{table} ({names}) "
+                        f"SELECT {names} FROM temp.{staging_table(table)} ORDER BY 1")
+        if added:
+            refresh_buckets(cur, "temp.import_changes")
+            # imported rows land anywhere in the history, readers have to reload rather than extend
+            bump_generation(cur)
+        conn.commit()
+        results["published, aggregates refreshed"] = (added, time.perf_counter() - start)
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    skipped = [name for name in os.listdir(directory)
+               if os.path.splitext(name)[0] not in SOURCE_TABLES and os.path.splitext(name)[1] in FORMATS.values()]
+    if skipped:
+        print(f"not imported, rebuilt from log_data instead: {', '.join(sorted(skipped))}")
+    return results
+
+
+def staging_table(table):
+    return f"import_{table}"
+
+
+def import_table(cur, table, path, fmt):
+    # reads the file into a temp table shaped like the target, returns (rows, seconds)
+    start = time.perf_counter()
+    chunks = read_csv(path) if fmt == "csv" else read_columnar(path)
+    header = next(chunks)
+    names = header if fmt == "csv" else [name for name, _ in header["columns"]]
+    kinds = dict(table_columns(cur, table))
+    missing = [name for name in names if name not in kinds]
+    if missing:
+        raise ValueError(f"{path} has columns {missing} that {table} does not have")
+
+    staging = staging_table(table)
+    cur.execute(f"CREATE TEMP TABLE IF NOT EXISTS {staging} AS SELECT * FROM main.{table} WHERE 0")
+    sql = f"INSERT INTO temp.{staging} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})"
+    n_rows = 0
+    for rows in chunks:
+        if fmt == "csv":
+            rows = convert_csv_rows(rows, [kinds[name] for name in names])
+        cur.executemany(sql, rows)
+        n_rows += len(rows)
+    return n_rows, time.perf_counter() - start
+
+
+def report(action, results):
+    for table, (n_rows, seconds) in results.items():
+        rate = f", {n_rows / seconds:,.0f} rows/s" if n_rows and seconds > 0 else ""
+        print(f"{action} {table}: {n_rows} rows in {seconds:.2f}s{rate}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import the typing history.")
+    parser.add_argument("--db", help="database path, defaults to the app's database")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="write one file per table into a directory")
+    export.add_argument("directory")
+    export.add_argument("--format", choices=list(FORMATS), default="columnar")
+    export.add_argument("--tables", nargs="+", help="defaults to log_data, the archive and every aggregate table")
+
+    load = commands.add_parser("import", help="merge an exported directory into the database")
+    load.add_argument("directory")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        report("exported", export_history(args.directory, args.format, args.tables, db_path=args.db))
+    else:
+        report("imported", import_history(args.directory, db_path=args.db))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import argparse
+import os
+import sqlite3
+import time
+
+from src.rollups import refresh_buckets
+from src.utils import bump_generation, get_db_path, init_database
+
+# a timestamp recorded on both machines keeps the higher value, a NULL only wins against a NULL;
+# the rule is symmetric, so merging a into b gives the same log_data as merging b into a
+RESOLVED_VALUE = """
+    CASE WHEN l.value IS NULL THEN o.value
+         WHEN o.value IS NULL THEN l.value
+         ELSE MAX(l.value, o.value) END
+"""
+
+
+def merge_history(other_path, db_path=None):
+    # folds another machine's database into this one in a single transaction,
+    # returns (rows added, rows changed, archive blocks added)
+    db_path = db_path or get_db_path()
+    if os.path.realpath(other_path) == os.path.realpath(db_path):
+        raise ValueError("cannot merge a database into itself")
+    if not os.path.exists(other_path):
+        raise FileNotFoundError(other_path)
+    init_database(db_path)
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    cur = conn.cursor()
+    # ATTACH is not allowed inside a transaction
+    cur.execute("ATTACH DATABASE ? AS other", (other_path,))
+    try:
+        cur.execute("BEGIN IMMEDIATE")
+
+        # every row the merge adds or changes, found with one join instead of a lookup per row
+        cur.execute("DROP TABLE IF EXISTS temp.merge_changes")
+        cur.execute(f"""
+            CREATE TEMP TABLE merge_changes AS
+            SELECT o.timestamp AS timestamp, {RESOLVED_VALUE} AS value, l.timestamp IS NOT NULL AS existed
+            FROM other.log_data o
+            LEFT JOIN main.log_data l ON l.timestamp = o.timestamp
+            WHERE l.timestamp IS NULL OR ({RESOLVED_VALUE}) IS NOT l.value
+        """)
+        added, changed = cur.execute(
+            "SELECT COUNT(*) - COALESCE(SUM(existed), 0), COALESCE(SUM(existed), 0) FROM temp.merge_changes"
+        ).fetchone()
+
+        # WHERE true keeps the parser from reading ON CONFLICT as a join constraint
+        cur.execute("""
+            INSERT INTO main.log_data (timestamp, value)
+            SELECT timestamp, value FROM temp.merge_changes WHERE true
+            ON CONFLICT(timestamp) DO UPDATE SET value = excluded.value
+        """)
+
+        archived = 0
+        has_archive = cur.execute(
+            "SELECT 1 FROM other.sqlite_master WHERE type = 'table' AND name = 'interval_archive'").fetchone()
+        if has_archive:
+            # blocks of raw intervals cannot be combined, the local one wins on a collision
+            cur.execute("""
+                INSERT OR IGNORE INTO main.interval_archive (start_ms, intervals)
+                SELECT start_ms, intervals FROM other.interval_archive
+            """)
+            archived = cur.rowcount
+
+        if added or changed:
+            refresh_buckets(cur, "temp.merge_changes")
+            # merged rows land anywhere in the history, readers have to reload rather than extend
+            bump_generation(cur)
+        cur.execute("DROP TABLE temp.merge_changes")
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    finally:
+        cur.execute("DETACH DATABASE other")
+        conn.close()
+    return added, changed, archived
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge the typing history of another machine into this one.")
+    parser.add_argument("other", help="path of the other machine's data.db")
+    parser.add_argument("--db", help="database path, defaults to the app's database")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    added, changed, archived = merge_history(args.other, db_path=args.db)
+    print(f"added {added} rows, changed {changed}, archived {archived} interval blocks "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import argparse
+import sqlite3
+import time
+
+import numpy as np
+
+from src.rollups import refresh_buckets
+from src.utils import bump_generation, get_db_path
+
+MAX_DELTA_MS = 2 ** 16 - 1
+
+
+def pack_key_times(times, offset=0):
+    # one chunk per bin from ns key times plus the offset that makes them wall-clock: the first key in ms,
+    # then the gaps to every following key as uint16 ms, times are floored so no key moves across a bin edge
+    ms = (np.asarray(times, dtype=np.int64) + offset) // 1_000_000
+    deltas = np.minimum(np.diff(ms), MAX_DELTA_MS).astype("<u2")
+    return int(ms[0]), deltas.tobytes()
+
+
+def unpack_key_times(start_ms, blob):
+    deltas = np.frombuffer(blob, dtype="<u2")
+    times = np.empty(len(deltas) + 1, dtype=np.int64)
+    times[0] = start_ms
+    np.cumsum(deltas, out=times[1:])
+    times[1:] += start_ms
+    return times
+
+
+def iter_chunks(cur):
+    # streams the archive in time order, one chunk of key times at a time
+    cur.execute("SELECT start_ms, intervals FROM interval_archive ORDER BY start_ms")
+    for start_ms, blob in cur:
+        yield unpack_key_times(start_ms, blob)
+
+
+def rebin_key_times(chunks, bin_size, threshold, min_recordings):
+    # replays KeyboardHandler.on_press and process_current_bin over archived key times,
+    # yields (timestamp, wpm) for every bin that would have been written
+    bin_ms = int(bin_size * 1000)
+    threshold_ms = threshold * 1000
+    last = None
+    total = 0
+    count = 0
+
+    for times in chunks:
+        for t in times.tolist():
+            if last is not None:
+                if last // bin_ms < t // bin_ms:
+                    if count >= min_recordings:
+                        yield last // 1000, round(60 / (total / count / 1000 * 5))
+                    total = 0
+                    count = 0
+
+                interval = t - last
+                if interval < threshold_ms:
+                    total += interval
+                    count += 1
+            last = t
+
+    if count >= min_recordings:
+        yield last // 1000, round(60 / (total / count / 1000 * 5))
+
+
+def rebin_archive(bin_size, threshold, min_recordings, db_path=None, batch_size=10000):
+    # rebuilds log_data wherever the archive has keys, rows from before the archive are kept;
+    # every batch is its own transaction so the app's writer only ever waits for one of them
+    db_path = db_path or get_db_path()
+    conn = sqlite3.connect(db_path, timeout=30)
+    # the archive is streamed on its own connection, WAL lets batches commit while it reads
+    conn.execute("PRAGMA journal_mode=WAL")
+    read_conn = sqlite3.connect(db_path)
+    write_cur = conn.cursor()
+    write_cur.execute("CREATE TEMP TABLE IF NOT EXISTS rebin_changes (timestamp INTEGER PRIMARY KEY)")
+
+    spans = []
+    rows = []
+    n_rows = 0
+    committed = False
+
+    def covered(chunks):
+        for times in chunks:
+            spans.append((int(times[0]) // 1000, int(times[-1]) // 1000))
+            # a long stretch of archive without a single bin still has to be written out
+            if len(spans) >= batch_size:
+                flush()
+            yield times
+
+    def flush():
+        nonlocal committed
+        if not spans and not rows:
+            return
+        # spans always go first, they can only contain rows yielded after them
+        write_cur.executemany("DELETE FROM log_data WHERE timestamp BETWEEN ? AND ?", spans)
+        write_cur.executemany("INSERT OR REPLACE INTO log_data (timestamp, value) VALUES (?, ?)", rows)
+        # one timestamp per minute of each span finds the buckets rows were deleted from, a row can
+        # belong to a span of the batch before, so the rows are added as well
+        write_cur.executemany("INSERT OR IGNORE INTO temp.rebin_changes (timestamp) VALUES (?)",
+                              [(t,) for first, last in spans for t in range(first - first % 60, last + 1, 60)])
+        write_cur.executemany("INSERT OR IGNORE INTO temp.rebin_changes (timestamp) VALUES (?)",
+                              [(ts,) for ts, _ in rows])
+        refresh_buckets(write_cur, "temp.rebin_changes")
+        write_cur.execute("DELETE FROM temp.rebin_changes")
+        conn.commit()
+        committed = True
+        spans.clear()
+        rows.clear()
+
+    try:
+        bins = rebin_key_times(covered(iter_chunks(read_conn.cursor())), bin_size, threshold, min_recordings)
+        for row in bins:
+            rows.append(row)
+            n_rows += 1
+            if len(rows) >= batch_size:
+                flush()
+        flush()
+    finally:
+        # whatever flush() did not commit belongs to a failed batch; older history changed either way,
+        # and readers only pick that up through the generation
+        conn.rollback()
+        if committed:
+            bump_generation(write_cur)
+            conn.commit()
+        conn.close()
+        read_conn.close()
+    return n_rows
+
+
+def main():
+    from src.keyboard_handler import RECORDING_THRESHOLD, MIN_RECORDINGS
+
+    parser = argparse.ArgumentParser(description="Rebuild log_data from the keystroke interval archive.")
+    parser.add_argument("--db", help="database path, defaults to the app's database")
+    parser.add_argument("--bin-size", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=RECORDING_THRESHOLD)
+    parser.add_argument("--min-recordings", type=int, default=MIN_RECORDINGS)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    n_rows = rebin_archive(args.bin_size, args.threshold, args.min_recordings, db_path=args.db)
+    print(f"wrote {n_rows} bins in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
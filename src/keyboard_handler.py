@@ -1,10 +1,10 @@
 import time
 
 from src.db_handlers import DBWriter
+from src.write_queue import WriteQueue
 
 RECORDING_THRESHOLD = 1.0
 MIN_RECORDINGS = 8
-EXCLUDED_KEYS = {}
 
 EXCEPTIONS = {
     '(', ')', '[', ']', '{', '}', '<', '>',
@@ -14,19 +14,44 @@ EXCEPTIONS = {
     '@', '#', '$', '\\', '_', '`', '"', "'",
 }
 
+# key kinds, decided once per key class
+CHARACTER = 0
+SPECIAL = 1
+
+NS = 1_000_000_000
+
+
 class KeyboardHandler:
-    def __init__(self, min_bin_size):
-        self.db = DBWriter()
+    def __init__(self, min_bin_size, archive_intervals=False, db=None, clock=time.perf_counter_ns,
+                 wall_clock=time.time_ns):
+        self.db = db or DBWriter()
+        self.writer = WriteQueue(self.db)
         self.listener = None
-        self.last_key_press = time.time()
-        self.min_bin_size = min_bin_size
-        self.current_bin = []
+        self.excluded_keys = set()
         self.excluded_keys_pressed = set()
+        self.key_kinds = {}
+
+        # intervals are measured on the monotonic clock, the wall clock is only used to stamp bins;
+        # the monotonic clock stops while the machine sleeps, so the offset is read again at every flush
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.last_key_press = clock()
+        self.wall_offset = wall_clock() - self.last_key_press
+        self.threshold = int(RECORDING_THRESHOLD * NS)
+        self.bin_length = min_bin_size * NS
+        self.bin_end = self.get_bin_end(self.last_key_press)
+
+        # running sum and count of the intervals in the current bin
+        self.bin_total = 0
+        self.bin_count = 0
+
+        # key times of the current bin, kept only when the interval archive is enabled
+        self.archive_intervals = archive_intervals
+        self.bin_key_times = []
 
     def start_monitoring(self):
         from pynput import keyboard
-        global EXCLUDED_KEYS
-        EXCLUDED_KEYS = {
+        self.excluded_keys = {
             keyboard.Key.ctrl, keyboard.Key.ctrl_l, keyboard.Key.ctrl_r,
             keyboard.Key.alt, keyboard.Key.alt_l, keyboard.Key.alt_r,
             keyboard.Key.cmd, keyboard.Key.cmd_l, keyboard.Key.cmd_r,
@@ -39,49 +64,77 @@ class KeyboardHandler:
         self.listener = keyboard.Listener(on_press=self.on_press, on_release=self.on_release)
         self.listener.start()
 
+    def classify(self, key):
+        # character keys carry a char, special keys (pynput's Key enum) don't
+        kind = CHARACTER if hasattr(key, 'char') else SPECIAL
+        self.key_kinds[key.__class__] = kind
+        return kind
+
+    def get_bin_end(self, now):
+        # monotonic time at which the wall-clock bin containing `now` ends
+        wall = now + self.wall_offset
+        return (wall // self.bin_length + 1) * self.bin_length - self.wall_offset
+
     def on_press(self, key):
-        # ignore special keys
-        if key in EXCLUDED_KEYS:
-            self.excluded_keys_pressed.add(key)
-            return
+        # character keys are never hashed, pynput hashes them through repr()
+        kind = self.key_kinds.get(key.__class__)
+        if kind is None:
+            kind = self.classify(key)
 
-        # ignore non-characters
-        if not hasattr(key, 'char'):
+        # ignore special keys
+        if kind is SPECIAL:
+            if key in self.excluded_keys:
+                self.excluded_keys_pressed.add(key)
             return
 
         if self.excluded_keys_pressed and key.char not in EXCEPTIONS:
             return
 
-        current_time = time.time()
-        time_passed = current_time - self.last_key_press
+        now = self.clock()
+        if now >= self.bin_end:
+            self.process_current_bin(now)
+            self.bin_end = self.get_bin_end(now)
 
-        if self.last_key_press // self.min_bin_size < current_time // self.min_bin_size:
-            self.process_current_bin()
+        time_passed = now - self.last_key_press
+        if time_passed < self.threshold:
+            self.bin_total += time_passed
+            self.bin_count += 1
 
-        if time_passed < RECORDING_THRESHOLD:
-            self.current_bin.append(time_passed)
+        if self.archive_intervals:
+            self.bin_key_times.append(now)
 
-        self.last_key_press = current_time
+        self.last_key_press = now
 
     def on_release(self, key):
         # Remove from pressed keys set if released
-        if key in self.excluded_keys_pressed:
+        if self.excluded_keys_pressed and self.key_kinds.get(key.__class__) is SPECIAL:
             self.excluded_keys_pressed.discard(key)
 
-    def process_current_bin(self):
-        if len(self.current_bin) < MIN_RECORDINGS:
-            self.current_bin = []
-        else:
-            mean = sum(self.current_bin) / len(self.current_bin)
+    def process_current_bin(self, now):
+        # the bin is stamped with the offset its keys were measured against, the next one gets a fresh
+        # offset, so a sleep since the last flush cannot push bins back onto timestamps already written
+        offset = self.wall_offset
+        self.wall_offset = self.wall_clock() - now
+
+        if self.bin_key_times:
+            self.writer.put_intervals(self.bin_key_times, offset)
+            self.bin_key_times = []
+
+        if self.bin_count >= MIN_RECORDINGS:
+            mean = self.bin_total / self.bin_count / NS
             wpm = round(60 / (mean * 5))
-            self.db.insert_data(int(self.last_key_press), wpm)
+            self.writer.put((self.last_key_press + offset) // NS, wpm)
             print("loaded", wpm, "WMP")
-            self.current_bin = []
+
+        self.bin_total = 0
+        self.bin_count = 0
 
     def stop(self):
+        # the listener only exists once startup got as far as importing pynput
         if self.listener:
             print("Stopping listener...")
             self.listener.stop()
-
-        self.listener.join()
+            self.listener.join()
+        self.writer.stop()
+        print("Writer stats:", self.writer.stats())
         self.db.close()
@@ -0,0 +1,225 @@
+import sqlite3
+import threading
+import time
+
+from src import perf
+from src.utils import get_db_path
+
+# task name and how long after its last completed run it is due again, in seconds,
+# the checkpoint follows the tasks that write so their pages reach the database file
+TASKS = [
+    ("vacuum", 60 * 60),
+    ("analyze", 24 * 60 * 60),
+    ("checkpoint", 10 * 60),
+    ("quick_check", 24 * 60 * 60),
+]
+SLICE_BUDGET = 0.05  # seconds of work before giving the writer a turn
+SLICE_PAUSE = 0.2
+LOCK_TIMEOUT = 0.05  # give up on a step rather than wait behind the writer
+VACUUM_PAGES = 256
+ANALYSIS_LIMIT = 1000
+# rows of a table read per step when its quick_check does not fit in a slice, halved whenever a read overruns
+CHECK_ROWS = 5000
+POLL_INTERVAL = 30
+STOP_TIMEOUT = 2
+# what next() returns once a task has run out of steps
+DONE = object()
+
+
+class Maintenance:
+    # keeps the database in shape while the app is idle, every step is short and can be skipped
+    def __init__(self, db_path=None):
+        self.db_path = db_path or get_db_path()
+        self.idle = threading.Event()
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="TypeSpeedMonitor-maintenance", daemon=True)
+        self.conn = None
+        # a task interrupted by activity picks up where it left off
+        self.current = None
+        self.deadline = 0
+        self.steps = 0
+        self.skipped = 0
+
+    def start(self):
+        self.thread.start()
+
+    def set_idle(self, idle):
+        if idle:
+            self.idle.set()
+        else:
+            self.idle.clear()
+
+    def stop(self):
+        # every step ends with its slice, the thread is a daemon if one hangs anyway
+        self.stopping.set()
+        self.idle.set()
+        self.thread.join(STOP_TIMEOUT)
+        if self.thread.is_alive():
+            print("Maintenance: still busy, not waiting for it")
+
+    def _run(self):
+        self.conn = sqlite3.connect(self.db_path, timeout=LOCK_TIMEOUT)
+        try:
+            while not self.stopping.is_set():
+                if not self.idle.wait(POLL_INTERVAL) or self.stopping.is_set():
+                    continue
+                try:
+                    due = self.run_slice()
+                except Exception as e:
+                    # a broken task is dropped, maintenance itself carries on
+                    self.conn.rollback()
+                    self.skipped += 1
+                    self.current = None
+                    print(f"Maintenance: slice failed: {e}")
+                    due = False
+                if not due:
+                    # nothing due, look again later
+                    self.stopping.wait(POLL_INTERVAL)
+                else:
+                    self.stopping.wait(SLICE_PAUSE)
+        finally:
+            self.conn.close()
+
+    def run_slice(self):
+        # runs steps until the budget is used up, False when no task is due
+        deadline = self.deadline = time.monotonic() + SLICE_BUDGET
+        while time.monotonic() < deadline and self.idle.is_set() and not self.stopping.is_set():
+            if self.current is None:
+                name = self.next_due()
+                if name is None:
+                    return False
+                self.current = name, getattr(self, name)()
+
+            name, steps = self.current
+            try:
+                with perf.timed(f"maintenance.{name}"):
+                    finished = next(steps, DONE) is DONE
+                if finished:
+                    # also needs the write lock, a task that cannot be recorded as done stays due
+                    self.set_last_run(name)
+                    self.current = None
+                    print(f"Maintenance: {name} done")
+                else:
+                    self.steps += 1
+            except sqlite3.OperationalError as e:
+                # most likely the writer holds the lock, the task stays due and runs again later
+                self.conn.rollback()
+                self.skipped += 1
+                self.current = None
+                print(f"Maintenance: {name} skipped: {e}")
+                return True
+        return True
+
+    def next_due(self):
+        now = time.time()
+        for name, interval in TASKS:
+            if now - self.get_last_run(name) >= interval:
+                return name
+        return None
+
+    def get_last_run(self, name):
+        row = self.conn.execute("SELECT value FROM db_meta WHERE key = ?", (f"maintenance.{name}",)).fetchone()
+        return row[0] if row else 0
+
+    def set_last_run(self, name):
+        self.conn.execute("""
+            INSERT INTO db_meta (key, value) VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value
+        """, (f"maintenance.{name}", int(time.time())))
+        self.conn.commit()
+
+    def run_bounded(self, sql, params=()):
+        # all rows of sql, or None when it was interrupted at the end of the slice;
+        # interrupt() also stops quick_check's b-tree walk, which a progress handler only sees once it is done
+        expired = threading.Event()
+
+        def interrupt():
+            expired.set()
+            self.conn.interrupt()
+
+        timer = threading.Timer(max(0, self.deadline - time.monotonic()), interrupt)
+        timer.start()
+        try:
+            return self.conn.execute(sql, params).fetchall()
+        except sqlite3.OperationalError:
+            if expired.is_set():
+                return None
+            raise
+        finally:
+            timer.cancel()
+
+    def key_columns(self, table):
+        pk = sorted((row[5], row[1]) for row in self.conn.execute(f"PRAGMA table_info({table})") if row[5])
+        return [name for _, name in pk] or ["rowid"]
+
+    def tables(self):
+        return [row[0] for row in self.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+
+    # every task is a generator, one step per next()
+
+    def checkpoint(self):
+        # PASSIVE copies what it can without waiting for readers or blocking the writer
+        busy, wal_pages, checkpointed = self.conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+        print(f"Maintenance: checkpointed {checkpointed} of {wal_pages} WAL pages")
+        yield
+
+    def vacuum(self):
+        # only databases created with auto_vacuum=INCREMENTAL can give pages back a few at a time,
+        # converting an older one takes a full VACUUM, which would hold the write lock far too long
+        if self.conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return
+        while self.conn.execute("PRAGMA freelist_count").fetchone()[0] > 0:
+            # execute() only steps the pragma once, which frees a single page
+            self.conn.executescript(f"PRAGMA incremental_vacuum({VACUUM_PAGES});")
+            yield
+
+    def analyze(self):
+        # analysis_limit bounds how many rows of each index ANALYZE looks at
+        self.conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+        for table in self.tables():
+            self.conn.execute(f"ANALYZE {table}")
+            self.conn.commit()
+            yield
+
+    def quick_check(self):
+        # the pragma cannot be resumed, so it gets a second try in a slice of its own
+        # before the table is checked a range at a time instead
+        for table in self.tables():
+            rows = None
+            for attempt in range(2):
+                rows = self.run_bounded(f"PRAGMA quick_check({table})")
+                if rows is not None:
+                    break
+                yield
+            if rows is None:
+                yield from self.check_ranges(table)
+                continue
+            problems = [row[0] for row in rows]
+            if problems != ["ok"]:
+                print(f"Maintenance: quick_check found problems in {table}: {problems}")
+            yield
+
+    def check_ranges(self, table):
+        # reads every row in key order, which walks every page of the table's b-tree;
+        # catches malformed pages, not the index and constraint checks only quick_check does
+        key = self.key_columns(table)
+        columns = ", ".join(key)
+        limit = CHECK_ROWS
+        last = None
+        while True:
+            where = f"WHERE ({columns}) > ({', '.join('?' * len(key))})" if last else ""
+            try:
+                rows = self.run_bounded(f"SELECT {columns}, * FROM {table} {where} ORDER BY {columns} LIMIT ?",
+                                        (*(last or ()), limit))
+            except sqlite3.DatabaseError as e:
+                print(f"Maintenance: quick_check found problems in {table}: {e}")
+                return
+            if rows is None:
+                limit = max(1, limit // 2)
+            elif len(rows) < limit:
+                return
+            else:
+                last = rows[-1][:len(key)]
+                limit = min(CHECK_ROWS, limit * 2)
+            yield
@@ -0,0 +1,67 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt6.QtCore import QObject, Qt, pyqtSignal
+from PyQt6.QtGui import QImage
+
+
+class OffscreenRenderer(QObject):
+    # finished images, always delivered on the GUI thread
+    rendered = pyqtSignal(QImage)
+    finished = pyqtSignal(int, QImage)
+
+    def __init__(self, render, parent=None):
+        super().__init__(parent)
+        # render(job, is_current) runs on the worker thread, must not touch widgets and
+        # may return None once is_current() turns False
+        self.render = render
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="TypeSpeedMonitor-render")
+        self.lock = threading.Lock()
+        # bumped by every request, a job whose generation is behind is stale
+        self.generation = 0
+        self.pending = None
+        self.cancelled = 0
+        self.finished.connect(self.deliver, Qt.ConnectionType.QueuedConnection)
+
+    def request(self, job):
+        with self.lock:
+            self.generation += 1
+            if self.pending is not None and self.pending.cancel():
+                self.cancelled += 1
+            self.pending = self.executor.submit(self._run, job, self.generation)
+
+    def is_current(self, generation):
+        with self.lock:
+            return generation == self.generation
+
+    def _run(self, job, generation):
+        if not self.is_current(generation):
+            return
+        try:
+            image = self.render(job, lambda: self.is_current(generation))
+        except Exception as e:
+            print(f"Error rendering: {e}")
+            return
+
+        if image is None or not self.is_current(generation):
+            with self.lock:
+                self.cancelled += 1
+            return
+        self.finished.emit(generation, image)
+
+    def deliver(self, generation, image):
+        # a newer request may have come in while this one was queued for delivery
+        if self.is_current(generation):
+            self.rendered.emit(image)
+
+    def wait(self):
+        # blocks until the latest request has been rendered, delivery still needs the event loop
+        with self.lock:
+            pending = self.pending
+        if pending is not None:
+            pending.result()
+
+    def shutdown(self):
+        with self.lock:
+            self.generation += 1
+        self.executor.shutdown(wait=True, cancel_futures=True)
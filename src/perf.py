@@ -0,0 +1,94 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+ENV_VAR = "TYPESPEEDMONITOR_PERF"
+WINDOW = 512  # most recent samples kept per stage
+# histogram bucket edges in ms, the last bucket is open ended
+BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000]
+
+enabled = bool(os.environ.get(ENV_VAR))
+stages = {}
+lock = threading.Lock()
+
+
+class StageTimer:
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_TIMER = NullTimer()
+
+
+def enable(on=True):
+    global enabled
+    enabled = on
+
+
+def timed(stage):
+    # `with perf.timed("stage"):` costs one global lookup when instrumentation is off
+    if not enabled:
+        return NULL_TIMER
+    return StageTimer(stage)
+
+
+def record(stage, seconds):
+    # safe to call from any thread
+    with lock:
+        samples = stages.get(stage)
+        if samples is None:
+            samples = stages[stage] = {"recent": deque(maxlen=WINDOW), "count": 0, "total": 0.0}
+        samples["recent"].append(seconds)
+        samples["count"] += 1
+        samples["total"] += seconds
+
+
+def clear():
+    with lock:
+        stages.clear()
+
+
+def snapshot():
+    # per stage: lifetime count and mean, percentiles and a histogram over the recent window
+    with lock:
+        copies = {stage: (np.array(s["recent"]) * 1e3, s["count"], s["total"]) for stage, s in stages.items()}
+
+    result = {}
+    for stage, (recent, count, total) in sorted(copies.items()):
+        counts = np.histogram(recent, bins=[0] + BUCKETS_MS + [np.inf])[0]
+        result[stage] = {
+            "count": count,
+            "mean_ms": total / count * 1e3,
+            "p50_ms": float(np.percentile(recent, 50)),
+            "p90_ms": float(np.percentile(recent, 90)),
+            "p99_ms": float(np.percentile(recent, 99)),
+            "max_ms": float(recent.max()),
+            "histogram": {"edges_ms": BUCKETS_MS, "counts": counts.tolist()},
+        }
+    return result
+
+
+def dump(path):
+    with open(path, "w") as f:
+        json.dump({"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "window": WINDOW, "stages": snapshot()}, f, indent=2)
+    print(f"Wrote performance stats to {path}")
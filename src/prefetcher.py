@@ -0,0 +1,98 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class WindowPrefetcher:
+    def __init__(self, load, max_entries=32):
+        # load(key) runs on the worker thread and must not touch Qt objects
+        self.load = load
+        self.max_entries = max_entries
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="TypeSpeedMonitor-prefetch")
+        self.lock = threading.Lock()
+        self.windows = OrderedDict()
+        self.pending = {}
+        # bumped by clear() so loads started before it are not stored
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, load=None):
+        # load overrides the worker's loader for misses served on the caller's thread
+        with self.lock:
+            if key in self.windows:
+                self.windows.move_to_end(key)
+                self.hits += 1
+                return self.windows[key]
+            future = self.pending.get(key)
+
+        # a load that is already running finishes sooner than starting over,
+        # one that is still queued is cancelled and done on the caller's thread
+        if future is not None and (future.running() or future.done()):
+            try:
+                window = future.result()
+            except Exception:
+                window = None
+            if window is not None:
+                with self.lock:
+                    self.hits += 1
+                return window
+        elif future is not None:
+            future.cancel()
+            with self.lock:
+                self.pending.pop(key, None)
+
+        with self.lock:
+            self.misses += 1
+            generation = self.generation
+        window = (load or self.load)(key)
+        self.put(key, window, generation)
+        return window
+
+    def put(self, key, window, generation=None):
+        # a window loaded before the last clear() is dropped, checked under the same lock as the store
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return
+            self.pending.pop(key, None)
+            self.windows[key] = window
+            self.windows.move_to_end(key)
+            while len(self.windows) > self.max_entries:
+                self.windows.popitem(last=False)
+
+    def prefetch(self, keys):
+        for key in keys:
+            with self.lock:
+                if key in self.windows or key in self.pending:
+                    continue
+                self.pending[key] = self.executor.submit(self._load, key, self.generation)
+
+    def _load(self, key, generation):
+        try:
+            window = self.load(key)
+        except Exception as e:
+            print(f"Error prefetching {key}: {e}")
+            with self.lock:
+                if generation == self.generation:
+                    self.pending.pop(key, None)
+            raise
+
+        self.put(key, window, generation)
+        return window
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            for future in self.pending.values():
+                future.cancel()
+            self.pending.clear()
+            self.windows.clear()
+
+    def stats(self):
+        with self.lock:
+            return {"windows": len(self.windows), "pending": len(self.pending),
+                    "hits": self.hits, "misses": self.misses}
+
+    def shutdown(self):
+        self.clear()
+        self.executor.shutdown(wait=True, cancel_futures=True)
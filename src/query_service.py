@@ -0,0 +1,115 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt6.QtCore import QObject, Qt, pyqtSignal
+
+from src import perf
+
+MAX_WORKERS = 2
+
+
+class QueryService(QObject):
+    # results travel to the GUI thread through this, callbacks only ever run there
+    finished = pyqtSignal(str, int, object)
+
+    def __init__(self, db, max_workers=MAX_WORKERS, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="TypeSpeedMonitor-query")
+        self.lock = threading.Lock()
+
+        # every worker reads through its own connection, long reads never hold the GUI's reader lock;
+        # the cache and indexes are the GUI reader's, so a worker only adds a connection and a snapshot mapping
+        self.local = threading.local()
+        self.readers = []
+
+        # per channel: the latest generation, its future and the callback waiting for it
+        self.generations = {}
+        self.pending = {}
+        self.callbacks = {}
+        self.submitted = 0
+        self.completed = 0
+        self.dropped_before = 0
+        self.dropped_after = 0
+        self.finished.connect(self.deliver, Qt.ConnectionType.QueuedConnection)
+
+    def submit(self, channel, query, callback):
+        # query(db) runs on a worker, callback(result) runs on the GUI thread unless a newer
+        # request on the same channel came in first
+        with self.lock:
+            generation = self.generations.get(channel, 0) + 1
+            self.generations[channel] = generation
+            previous = self.pending.get(channel)
+            if previous is not None and previous.cancel():
+                self.dropped_before += 1
+            self.callbacks[channel] = callback
+            self.submitted += 1
+            self.pending[channel] = self.executor.submit(self._run, channel, generation, query)
+        return generation
+
+    def is_current(self, channel, generation):
+        with self.lock:
+            return self.generations.get(channel) == generation
+
+    def reader(self):
+        db = getattr(self.local, "db", None)
+        if db is None:
+            db = self.local.db = self.db.share()
+            with self.lock:
+                self.readers.append(db)
+        return db
+
+    def _run(self, channel, generation, query):
+        # superseded while it waited for a worker
+        if not self.is_current(channel, generation):
+            with self.lock:
+                self.dropped_before += 1
+            return
+        try:
+            with perf.timed(f"query.{channel}"):
+                result = query(self.reader())
+        except Exception as e:
+            print(f"Error running {channel} query: {e}")
+            return
+        self.finished.emit(channel, generation, result)
+
+    def deliver(self, channel, generation, result):
+        with self.lock:
+            current = self.generations.get(channel) == generation
+            if current:
+                self.completed += 1
+                self.pending.pop(channel, None)
+                callback = self.callbacks.pop(channel)
+            else:
+                self.dropped_after += 1
+        if current:
+            callback(result)
+
+    def cancel(self, channel):
+        with self.lock:
+            self.generations[channel] = self.generations.get(channel, 0) + 1
+            future = self.pending.pop(channel, None)
+            self.callbacks.pop(channel, None)
+        if future is not None:
+            future.cancel()
+
+    def wait(self, channel):
+        # blocks until the latest request on the channel has run, delivery still needs the event loop
+        with self.lock:
+            future = self.pending.get(channel)
+        if future is not None:
+            future.result()
+
+    def stats(self):
+        with self.lock:
+            return {"submitted": self.submitted, "completed": self.completed,
+                    "dropped_before": self.dropped_before, "dropped_after": self.dropped_after}
+
+    def shutdown(self):
+        with self.lock:
+            for channel in self.generations:
+                self.generations[channel] += 1
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        print("Query stats:", self.stats())
+        for db in self.readers:
+            db.close()
@@ -0,0 +1,80 @@
+import numpy as np
+
+BLOCK = 60 * 60  # one leaf per hour, matching rollup_hour
+EMPTY = -1
+
+
+class RangeMaxIndex:
+    # max segment tree over per-block maxima, leaves are consecutive blocks starting at base
+    def __init__(self, block=BLOCK):
+        self.block = block
+        self.base = None
+        self.capacity = 0
+        self.tree = np.full(2, EMPTY, dtype=np.int64)
+
+    def build(self, timestamps, maxima):
+        blocks = np.asarray(timestamps, dtype=np.int64) // self.block
+        maxima = np.asarray(maxima, dtype=np.int64)
+        if not blocks.size:
+            self.base = None
+            self.capacity = 0
+            self.tree = np.full(2, EMPTY, dtype=np.int64)
+            return
+
+        self.base = int(blocks.min())
+        n_blocks = int(blocks.max()) - self.base + 1
+        # headroom so new blocks can be appended for a while without a rebuild
+        self.capacity = 1 << max(1, (2 * n_blocks - 1).bit_length())
+        self.tree = np.full(2 * self.capacity, EMPTY, dtype=np.int64)
+        np.maximum.at(self.tree, self.capacity + blocks - self.base, maxima)
+
+        width = self.capacity // 2
+        while width >= 1:
+            self.tree[width:2 * width] = np.maximum(self.tree[2 * width:4 * width:2],
+                                                    self.tree[2 * width + 1:4 * width:2])
+            width //= 2
+
+    def leaves(self):
+        if self.base is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        leaves = self.tree[self.capacity:]
+        used = np.flatnonzero(leaves != EMPTY)
+        return (used + self.base) * self.block, leaves[used]
+
+    def update(self, timestamp, value):
+        if value is None:
+            return
+        block = int(timestamp) // self.block
+        if self.base is None or not 0 <= block - self.base < self.capacity:
+            timestamps, maxima = self.leaves()
+            self.build(np.append(timestamps, timestamp), np.append(maxima, value))
+            return
+
+        i = self.capacity + block - self.base
+        if self.tree[i] >= value:
+            return
+        self.tree[i] = value
+        i //= 2
+        while i >= 1 and self.tree[i] < value:
+            self.tree[i] = value
+            i //= 2
+
+    def query(self, first_block, last_block):
+        # max over blocks first_block..last_block inclusive, None when they hold no data
+        if self.base is None:
+            return None
+        lo = max(first_block - self.base, 0) + self.capacity
+        hi = min(last_block - self.base, self.capacity - 1) + self.capacity + 1
+
+        result = EMPTY
+        tree = self.tree
+        while lo < hi:
+            if lo & 1:
+                result = max(result, tree[lo])
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                result = max(result, tree[hi])
+            lo //= 2
+            hi //= 2
+        return None if result == EMPTY else int(result)
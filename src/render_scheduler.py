@@ -0,0 +1,65 @@
+import time
+
+from PyQt6.QtCore import QObject, QTimer, Qt
+from PyQt6.QtGui import QGuiApplication
+
+SETTLE_DELAY = 150  # ms without motion before the full-quality render
+
+
+class RenderScheduler(QObject):
+    def __init__(self, render_full, render_motion, parent=None):
+        super().__init__(parent)
+        self.render_full = render_full
+        self.render_motion = render_motion
+        self.full_pending = False
+        self.motion_pending = False
+        self.in_motion = False
+        self.last_frame = 0.0
+
+        self.frame_timer = QTimer(self)
+        self.frame_timer.setSingleShot(True)
+        self.frame_timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.frame_timer.timeout.connect(self.on_frame)
+
+        self.settle_timer = QTimer(self)
+        self.settle_timer.setSingleShot(True)
+        self.settle_timer.setInterval(SETTLE_DELAY)
+        self.settle_timer.timeout.connect(self.on_settle)
+
+    def frame_interval(self):
+        screen = QGuiApplication.primaryScreen()
+        rate = screen.refreshRate() if screen else 0
+        return 1000 / rate if rate > 0 else 1000 / 60
+
+    def request_full(self):
+        self.full_pending = True
+        self.schedule()
+
+    def request_motion(self):
+        # scroll steps and resizes: cheap frames now, one full render once they stop
+        self.in_motion = True
+        self.motion_pending = True
+        self.settle_timer.start()
+        self.schedule()
+
+    def schedule(self):
+        # any number of requests within a frame collapse into a single render
+        if not self.frame_timer.isActive():
+            elapsed = (time.monotonic() - self.last_frame) * 1000
+            self.frame_timer.start(max(0, int(self.frame_interval() - elapsed)))
+
+    def on_frame(self):
+        self.last_frame = time.monotonic()
+        if self.in_motion:
+            # full requests made during motion are served by the settle render
+            if self.motion_pending:
+                self.motion_pending = False
+                self.render_motion()
+        elif self.full_pending:
+            self.full_pending = False
+            self.render_full()
+
+    def on_settle(self):
+        self.in_motion = False
+        self.motion_pending = False
+        self.request_full()
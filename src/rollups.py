@@ -0,0 +1,192 @@
+ROLLUP_LEVELS = {
+    "minute": 60,
+    "hour": 60 * 60,
+    "day": 60 * 60 * 24,
+    "week": 60 * 60 * 24 * 7,
+    "month": 60 * 60 * 24 * 30,
+    "year": 60 * 60 * 24 * 30 * 12,
+}
+
+# how many times each integer WPM value was recorded per bucket
+HISTOGRAM_LEVELS = {
+    "hour": 60 * 60,
+    "day": 60 * 60 * 24,
+}
+# values above this are counted as this, so one paste burst cannot widen every histogram row;
+# every writer and reader of the histograms clamps the same way, which keeps the counts exact
+HISTOGRAM_MAX = 300
+
+
+def rollup_table(level):
+    if level not in ROLLUP_LEVELS:
+        raise ValueError(f"Unrecognized rollup level {level}")
+    return f"rollup_{level}"
+
+
+def histogram_table(level):
+    if level not in HISTOGRAM_LEVELS:
+        raise ValueError(f"Unrecognized histogram level {level}")
+    return f"histogram_{level}"
+
+
+def rollup_level_for(bin_size):
+    # coarsest level whose buckets tile the bins exactly, None means raw rows are needed
+    best = None
+    for level, size in ROLLUP_LEVELS.items():
+        if bin_size % size == 0:
+            best = level
+    return best
+
+
+def create_rollup_tables(cur):
+    for level in ROLLUP_LEVELS:
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {rollup_table(level)} (
+                bucket INTEGER PRIMARY KEY,
+                value_sum INTEGER,
+                value_count INTEGER,
+                value_min INTEGER,
+                value_max INTEGER
+            )
+        """)
+
+    for level in HISTOGRAM_LEVELS:
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {histogram_table(level)} (
+                bucket INTEGER,
+                value INTEGER,
+                count INTEGER,
+                PRIMARY KEY (bucket, value)
+            ) WITHOUT ROWID
+        """)
+
+
+def rebuild_rollups(cur):
+    # minute buckets come from the raw rows, every coarser level from the minute level
+    cur.execute("DELETE FROM rollup_minute")
+    cur.execute("""
+        INSERT INTO rollup_minute (bucket, value_sum, value_count, value_min, value_max)
+        SELECT timestamp - timestamp % 60 AS bucket, SUM(value), COUNT(value), MIN(value), MAX(value)
+        FROM log_data
+        WHERE value IS NOT NULL
+        GROUP BY bucket
+    """)
+
+    for level, size in ROLLUP_LEVELS.items():
+        if level == "minute":
+            continue
+        table = rollup_table(level)
+        cur.execute(f"DELETE FROM {table}")
+        cur.execute(f"""
+            INSERT INTO {table} (bucket, value_sum, value_count, value_min, value_max)
+            SELECT bucket - bucket % {size} AS coarse, SUM(value_sum), SUM(value_count),
+                   MIN(value_min), MAX(value_max)
+            FROM rollup_minute
+            GROUP BY coarse
+        """)
+
+    rebuild_histograms(cur)
+
+
+def rebuild_histograms(cur):
+    # hour buckets come from the raw rows, day buckets from the hour buckets
+    cur.execute(f"DELETE FROM {histogram_table('hour')}")
+    cur.execute(f"""
+        INSERT INTO {histogram_table('hour')} (bucket, value, count)
+        SELECT timestamp - timestamp % {HISTOGRAM_LEVELS['hour']} AS bucket, MIN(value, {HISTOGRAM_MAX}) AS clamped, COUNT(*)
+        FROM log_data
+        WHERE value >= 0
+        GROUP BY bucket, clamped
+    """)
+
+    cur.execute(f"DELETE FROM {histogram_table('day')}")
+    cur.execute(f"""
+        INSERT INTO {histogram_table('day')} (bucket, value, count)
+        SELECT bucket - bucket % {HISTOGRAM_LEVELS['day']} AS coarse, MIN(value, {HISTOGRAM_MAX}) AS clamped, SUM(count)
+        FROM {histogram_table('hour')}
+        GROUP BY coarse, clamped
+    """)
+
+
+def update_rollups(cur, rows):
+    # rows are (timestamp, value) pairs that were actually inserted into log_data
+    rows = [(ts, value) for ts, value in rows if value is not None]
+    if not rows:
+        return
+
+    for level, size in ROLLUP_LEVELS.items():
+        cur.executemany(f"""
+            INSERT INTO {rollup_table(level)} (bucket, value_sum, value_count, value_min, value_max)
+            VALUES (?, ?, 1, ?, ?)
+            ON CONFLICT(bucket) DO UPDATE SET
+                value_sum = value_sum + excluded.value_sum,
+                value_count = value_count + excluded.value_count,
+                value_min = MIN(value_min, excluded.value_min),
+                value_max = MAX(value_max, excluded.value_max)
+        """, [(ts - ts % size, value, value, value) for ts, value in rows])
+
+    for level, size in HISTOGRAM_LEVELS.items():
+        cur.executemany(f"""
+            INSERT INTO {histogram_table(level)} (bucket, value, count)
+            VALUES (?, ?, 1)
+            ON CONFLICT(bucket, value) DO UPDATE SET count = count + 1
+        """, [(ts - ts % size, min(value, HISTOGRAM_MAX)) for ts, value in rows if value >= 0])
+
+
+def refresh_buckets(cur, changes):
+    # recomputes only the buckets containing a timestamp of the `changes` table, for bulk
+    # rewrites of log_data where per-row upserts would be slow and min/max cannot be subtracted
+    # every level's size is a whole number of minutes, so the touched minutes are all each level needs
+    cur.execute("DROP TABLE IF EXISTS temp.touched_minutes")
+    cur.execute("CREATE TEMP TABLE touched_minutes (bucket INTEGER PRIMARY KEY)")
+    cur.execute(f"INSERT OR IGNORE INTO temp.touched_minutes SELECT timestamp - timestamp % 60 FROM {changes}")
+
+    def touched(size):
+        cur.execute("DROP TABLE IF EXISTS temp.touched_buckets")
+        cur.execute("CREATE TEMP TABLE touched_buckets (bucket INTEGER PRIMARY KEY)")
+        cur.execute(f"INSERT OR IGNORE INTO temp.touched_buckets SELECT bucket - bucket % {size} FROM temp.touched_minutes")
+
+    for level, size in ROLLUP_LEVELS.items():
+        table = rollup_table(level)
+        # minute buckets come from the raw rows, every coarser level from the minute level
+        source = "log_data" if level == "minute" else "rollup_minute"
+        column = "timestamp" if level == "minute" else "bucket"
+        if level == "minute":
+            aggregates = "SUM(s.value), COUNT(s.value), MIN(s.value), MAX(s.value)"
+            where = "WHERE s.value IS NOT NULL"
+        else:
+            aggregates = "SUM(s.value_sum), SUM(s.value_count), MIN(s.value_min), MAX(s.value_max)"
+            where = ""
+        touched(size)
+        cur.execute(f"DELETE FROM {table} WHERE bucket IN (SELECT bucket FROM temp.touched_buckets)")
+        cur.execute(f"""
+            INSERT INTO {table} (bucket, value_sum, value_count, value_min, value_max)
+            SELECT t.bucket, {aggregates}
+            FROM temp.touched_buckets t
+            JOIN {source} s ON s.{column} >= t.bucket AND s.{column} < t.bucket + {size}
+            {where}
+            GROUP BY t.bucket
+        """)
+
+    hour, day = histogram_table("hour"), histogram_table("day")
+    touched(HISTOGRAM_LEVELS["hour"])
+    cur.execute(f"DELETE FROM {hour} WHERE bucket IN (SELECT bucket FROM temp.touched_buckets)")
+    cur.execute(f"""
+        INSERT INTO {hour} (bucket, value, count)
+        SELECT t.bucket, MIN(s.value, {HISTOGRAM_MAX}) AS clamped, COUNT(*)
+        FROM temp.touched_buckets t
+        JOIN log_data s ON s.timestamp >= t.bucket AND s.timestamp < t.bucket + {HISTOGRAM_LEVELS['hour']}
+        WHERE s.value >= 0
+        GROUP BY t.bucket, clamped
+    """)
+    touched(HISTOGRAM_LEVELS["day"])
+    cur.execute(f"DELETE FROM {day} WHERE bucket IN (SELECT bucket FROM temp.touched_buckets)")
+    cur.execute(f"""
+        INSERT INTO {day} (bucket, value, count)
+        SELECT t.bucket, MIN(s.value, {HISTOGRAM_MAX}) AS clamped, SUM(s.count)
+        FROM temp.touched_buckets t
+        JOIN {hour} s ON s.bucket >= t.bucket AND s.bucket < t.bucket + {HISTOGRAM_LEVELS['day']}
+        GROUP BY t.bucket, clamped
+    """)
+    cur.execute("DROP TABLE temp.touched_buckets")
+    cur.execute("DROP TABLE temp.touched_minutes")
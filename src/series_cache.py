@@ -0,0 +1,109 @@
+import time
+
+import numpy as np
+
+ROW_BYTES = 16  # int64 timestamp + float64 value
+MIN_CAPACITY = 1024
+
+# the cache only ever appends rows newer than its last one, which holds as long as every writer
+# either stamps rows in time order (the keyboard handler) or bumps the generation in db_meta
+# (re-binning, import, merge), which makes DBReader clear the cache and load it again
+
+
+class SeriesCache:
+    def __init__(self, span, max_bytes):
+        self.span = span
+        self.max_rows = max(1, max_bytes // ROW_BYTES)
+        self.timestamps = np.empty(MIN_CAPACITY, dtype=np.int64)
+        self.values = np.empty(MIN_CAPACITY, dtype=np.float64)
+        self.size = 0
+        # every row with timestamp >= start is held in memory, None until the first load
+        self.start = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def last_timestamp(self):
+        return int(self.timestamps[self.size - 1]) if self.size else None
+
+    @property
+    def nbytes(self):
+        return self.size * ROW_BYTES
+
+    def reset(self, start, rows):
+        self.size = 0
+        self.start = start
+        self.append(rows)
+
+    def clear(self):
+        self.size = 0
+        self.start = None
+        self.shrink()
+
+    def shrink(self):
+        # give back capacity once it is four times what is held, the doubling in append() stays amortized
+        capacity = max(MIN_CAPACITY, 2 * self.size)
+        if len(self.timestamps) >= 2 * capacity:
+            self.timestamps = self.timestamps[:capacity].copy()
+            self.values = self.values[:capacity].copy()
+
+    def append(self, rows):
+        # rows are (timestamp, value) pairs newer than everything cached, NULL values become NaN
+        if rows:
+            block = np.array(rows, dtype=np.float64).reshape(-1, 2)
+            n = len(block)
+            if self.size + n > len(self.timestamps):
+                capacity = max(2 * len(self.timestamps), self.size + n)
+                self.timestamps = np.resize(self.timestamps, capacity)
+                self.values = np.resize(self.values, capacity)
+
+            self.timestamps[self.size:self.size + n] = block[:, 0]
+            self.values[self.size:self.size + n] = block[:, 1]
+            self.size += n
+
+        self.evict()
+
+    def evict(self):
+        if self.start is None:
+            return
+
+        cutoff = int(time.time()) - self.span
+        drop = int(np.searchsorted(self.timestamps[:self.size], cutoff, side="left"))
+        start = max(self.start, cutoff)
+
+        if self.size - drop > self.max_rows:
+            drop = self.size - self.max_rows
+            start = int(self.timestamps[drop])
+
+        if drop > 0:
+            keep = self.size - drop
+            self.timestamps[:keep] = self.timestamps[drop:self.size]
+            self.values[:keep] = self.values[drop:self.size]
+            self.size = keep
+            self.shrink()
+        self.start = start
+
+    def covers(self, start):
+        return self.start is not None and start >= self.start
+
+    def lookup(self, start, end, count=True):
+        # same bounds as "timestamp BETWEEN start AND end", None if the range is not fully cached;
+        # count=False for internal reads like index edges, which would skew the hit rate of range reads
+        if not self.covers(start):
+            self.misses += count
+            return None
+
+        self.hits += count
+        timestamps = self.timestamps[:self.size]
+        lo = np.searchsorted(timestamps, start, side="left")
+        hi = np.searchsorted(timestamps, end, side="right")
+        return timestamps[lo:hi].copy(), self.values[lo:hi].copy()
+
+    def stats(self):
+        return {
+            "rows": self.size,
+            "bytes": self.nbytes,
+            "start": self.start,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,47 @@
+import importlib
+import threading
+import time
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+# imported first thing in main.py, so times are close to process start
+START = time.perf_counter()
+timeline = []
+
+# imported in this order, each stage is announced as soon as its modules are loaded;
+# pynput is not among them, App imports it on the thread that starts the listener
+STAGES = [
+    # only the summary tab still draws with matplotlib
+    ("summary", ["matplotlib", "matplotlib.figure", "matplotlib.backends.backend_agg", "src.views.SummaryGraph"]),
+]
+
+
+def mark(event):
+    elapsed = time.perf_counter() - START
+    timeline.append((event, elapsed))
+    print(f"[startup] {elapsed * 1e3:7.1f} ms  {event}")
+
+
+class Warmup(QObject):
+    # imports the slow modules off the GUI thread, stageReady is delivered on the GUI thread
+    stageReady = pyqtSignal(str)
+
+    def __init__(self, stages=STAGES, parent=None):
+        super().__init__(parent)
+        self.stages = stages
+        self.thread = threading.Thread(target=self._run, name="TypeSpeedMonitor-warmup", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def _run(self):
+        for stage, modules in self.stages:
+            for module in modules:
+                try:
+                    importlib.import_module(module)
+                except Exception as e:
+                    # left to the code that needs the module, which reports it where it matters
+                    print(f"Warm-up import of {module} failed: {e}")
+                else:
+                    mark(f"imported {module}")
+            self.stageReady.emit(stage)
@@ -5,23 +5,61 @@ import sys
 
 from appdirs import user_data_dir
 
+from src.rollups import create_rollup_tables, rebuild_rollups, rebuild_histograms
+
 
 def get_db_path():
+    # TYPESPEEDMONITOR_DB points the app at another database, e.g. a synthetic one for benchmarks
+    path = os.environ.get("TYPESPEEDMONITOR_DB")
+    if path:
+        return path
+
     data_dir = user_data_dir("TypeSpeedMonitor")
     os.makedirs(data_dir, exist_ok=True)
     return os.path.join(data_dir, "data.db")
 
 
-def init_database():
-    db_path = get_db_path()
+def init_database(db_path=None):
+    db_path = db_path or get_db_path()
 
     conn = sqlite3.connect(db_path)
     cur = conn.cursor()
+    # lets maintenance return free pages in small steps, only takes effect for new databases
+    cur.execute("PRAGMA auto_vacuum = INCREMENTAL")
     cur.execute("CREATE TABLE IF NOT EXISTS log_data (timestamp INTEGER PRIMARY KEY, value INTEGER)")
+    create_rollup_tables(cur)
+    cur.execute("CREATE TABLE IF NOT EXISTS interval_archive (start_ms INTEGER PRIMARY KEY, intervals BLOB)")
+    cur.execute("CREATE TABLE IF NOT EXISTS db_meta (key TEXT PRIMARY KEY, value INTEGER)")
+
+    # schema migrations, tracked with sqlite's user_version
+    version = cur.execute("PRAGMA user_version").fetchone()[0]
+    if version < 1:
+        # rollups, also fills the histogram tables of version 2
+        rebuild_rollups(cur)
+    elif version < 2:
+        # per-hour and per-day WPM histograms
+        rebuild_histograms(cur)
+    if version < 2:
+        cur.execute("PRAGMA user_version = 2")
+
     conn.commit()
     conn.close()
 
 
+def read_generation(cur):
+    # bumped by every job that rewrites existing history, readers drop their caches when it changes
+    cur.execute("SELECT value FROM db_meta WHERE key = 'generation'")
+    row = cur.fetchone()
+    return row[0] if row else 0
+
+
+def bump_generation(cur):
+    cur.execute("""
+        INSERT INTO db_meta (key, value) VALUES ('generation', 1)
+        ON CONFLICT(key) DO UPDATE SET value = value + 1
+    """)
+
+
 def get_resource_path(relative_path):
     try:
         base_path = sys._MEIPASS
@@ -0,0 +1,55 @@
+from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtGui import QFont
+from PyQt6.QtWidgets import QLabel
+
+from src import perf
+
+REFRESH_INTERVAL = 1000  # ms
+
+
+class PerfOverlay(QLabel):
+    # floats over the top right corner of its parent, shows the recent timings of every stage
+    def __init__(self, parent):
+        super().__init__(parent)
+        font = QFont("Menlo", 10)
+        font.setStyleHint(QFont.StyleHint.Monospace)
+        self.setFont(font)
+        self.setStyleSheet("""
+            QLabel {
+                color: #ECEFF4;
+                background: rgba(0, 0, 0, 170);
+                border-radius: 5px;
+                padding: 6px;
+            }
+        """)
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.setTextFormat(Qt.TextFormat.PlainText)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(REFRESH_INTERVAL)
+        self.refresh()
+
+    def refresh(self):
+        if not self.isVisible():
+            return
+
+        lines = [f"{'stage':<18}{'n':>7}{'p50':>9}{'p99':>9}{'max':>9}"]
+        for stage, stats in perf.snapshot().items():
+            lines.append(f"{stage:<18}{stats['count']:>7}{stats['p50_ms']:>9.2f}"
+                         f"{stats['p99_ms']:>9.2f}{stats['max_ms']:>9.2f}")
+        if len(lines) == 1:
+            lines.append("no samples yet")
+
+        self.setText("\n".join(lines))
+        self.adjustSize()
+        self.place()
+        self.raise_()
+
+    def place(self):
+        parent = self.parentWidget()
+        self.move(parent.width() - self.width() - 12, 12)
+
+    def toggle(self):
+        self.setVisible(not self.isVisible())
+        self.refresh()
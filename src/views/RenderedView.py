@@ -0,0 +1,46 @@
+from PyQt6.QtCore import pyqtSignal
+from PyQt6.QtGui import QPainter, QImage
+from PyQt6.QtWidgets import QWidget
+
+from src.offscreen_renderer import OffscreenRenderer
+
+
+def new_image(width, height, device_pixel_ratio):
+    # a transparent buffer at device resolution, drawn at widget size
+    image = QImage(max(1, round(width * device_pixel_ratio)), max(1, round(height * device_pixel_ratio)),
+                   QImage.Format.Format_ARGB32_Premultiplied)
+    image.setDevicePixelRatio(device_pixel_ratio)
+    image.fill(0)
+    return image
+
+
+class RenderedView(QWidget):
+    # shows the last image rendered off the GUI thread, painting itself never rasterizes a chart
+    resized = pyqtSignal()
+
+    def __init__(self, render):
+        super().__init__()
+        self.image = None
+        self.renderer = OffscreenRenderer(render, parent=self)
+        self.renderer.rendered.connect(self.set_image)
+
+    def request(self, job):
+        self.renderer.request(job)
+
+    def set_image(self, image):
+        self.image = image
+        self.update()
+
+    def paintEvent(self, event):
+        if self.image is None:
+            return
+        # until the render for a new size arrives, the previous frame is shown unscaled
+        painter = QPainter(self)
+        painter.drawImage(0, 0, self.image)
+
+    def resizeEvent(self, event):
+        self.resized.emit()
+        super().resizeEvent(event)
+
+    def stop(self):
+        self.renderer.shutdown()
@@ -1,24 +1,38 @@
 from datetime import datetime
 
 import numpy as np
-from PyQt6.QtCore import QTimer, Qt
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QImage
 from PyQt6.QtWidgets import QFrame, QVBoxLayout, QSizePolicy, QHBoxLayout, QWidget, QSpacerItem
-from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from matplotlib.figure import Figure
 
+from src.views.RenderedView import RenderedView
 from src.views.TimeRangeSlider import TimeRangeSlider
 from src.views.ToggleDarkmodeButton import ToggleDarkmodeButton
 from src.views.LabelSelection import LabelSelection
+from src import perf
+from src.histogram import WPMHistogram
+from src.render_scheduler import RenderScheduler
 from src.utils import apply_dark_theme, apply_light_theme, save_config
 
+DPI = 100
+# marked on the distribution, (quantile, label, line style)
+QUANTILE_MARKERS = [(0.1, "p10", ":"), (0.5, "median", "--"), (0.9, "p90", ":")]
+
 
 class SummaryGraph(QFrame):
     def __init__(self, main, db):
         super().__init__()
         self.db = db
+        self.queries = main.queries
         self.main_window = main
         self.is_paused = False
         self.color = '#699191' if main.dark_mode else 'steelblue'
+        self.histogram = WPMHistogram()
+        self.dirty = True
+        # slider drags and data notifications are coalesced into one redraw per frame
+        self.scheduler = RenderScheduler(self.plot_summary, self.plot_summary, parent=self)
 
         self.setStyleSheet("background: transparent;")
         self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
@@ -53,12 +67,15 @@ class SummaryGraph(QFrame):
         controls.setFocusPolicy(Qt.FocusPolicy.NoFocus)
         layout.addWidget(controls)
 
-        self.canvas = FigureCanvas(Figure(figsize=(8, 4)))
-        self.canvas.setFixedHeight(600)
-        layout.addWidget(self.canvas)
+        # the figure is drawn on a render thread, the view only shows finished frames
+        self.view = RenderedView(render_summary)
+        self.view.setFixedHeight(600)
+        self.view.resized.connect(self.on_view_resized)
+        layout.addWidget(self.view)
         layout.addStretch()
 
         self.main_window.modeToggled.connect(self.apply_style)
+        self.main_window.notifier.dataChanged.connect(self.on_data_changed)
 
         self.start_time, self.end_time = self.slider.get_interval()
         if main.config["summary_of"] == "day":
@@ -71,20 +88,18 @@ class SummaryGraph(QFrame):
         # initial plot and theme setting
         self.apply_style()
 
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.plot_summary)
-        self.timer.start(500)
-
-
     def pause(self):
-        if not self.is_paused:
-            self.timer.stop()
-            self.is_paused = True
+        self.is_paused = True
 
     def resume(self):
         if self.is_paused:
-            self.timer.start(500)
             self.is_paused = False
+            self.scheduler.request_full()
+
+    def on_data_changed(self):
+        # paused views catch up in resume()
+        if not self.is_paused:
+            self.scheduler.request_full()
 
     def update_slider(self, text):
         self.slider.update_format(text)
@@ -102,6 +117,7 @@ class SummaryGraph(QFrame):
             self.color = 'steelblue'
 
         self.toggle.apply_style()
+        self.dirty = True
         self.plot_summary()
 
     def set_interval(self, start, end):
@@ -114,53 +130,126 @@ class SummaryGraph(QFrame):
         else:
             self.title_from = datetime.fromtimestamp(start).strftime("%d %b %Y")
             self.title_to = datetime.fromtimestamp(end).strftime("%d %b %Y")
-
-    def plot_summary(self, bin_width=5):
-        self.canvas.figure.clear()
-        ax = self.canvas.figure.add_subplot(111)
-        data = self.db.read_data(self.start_time, self.end_time)
-        wpm_values = [val for _, val in data if val is not None]
-
-        if len(set(wpm_values)) <= 1:
-            ax.set_title("Not enough data available")
-
-        else:
-            bins = np.arange(min(wpm_values), max(wpm_values) + bin_width, bin_width)
-            counts, bin_edges = np.histogram(wpm_values, bins=bins)
-
-            percentages = (counts / sum(counts)) * 100
-            bin_centers = (bin_edges[:-1] + bin_edges[1:]) / 2
-
-            ax.bar(bin_centers, percentages, width=bin_width,
-                   color=self.color, alpha=0.7, align='center')
-
-            x_min, x_max = min(wpm_values), max(wpm_values)
-            x_pad = (x_max - x_min) * 0.1
-            ax.set_xlim(x_min - x_pad, x_max + x_pad)
-
-            # Determine x-axis ticks step size: 10 or 20
-            wpm_range = x_max - x_min
-            x_step = 20 if wpm_range > 100 else 10
-            xticks = np.arange(round((x_min - x_pad) / x_step) * x_step,
-                               round((x_max + x_pad) / x_step) * x_step + x_step,
-                               x_step)
-            ax.set_xticks(xticks)
-
-            ax.set_title(f"distribution from {self.title_from} to {self.title_to}", fontsize=12, fontweight='bold')
-            ax.set_xlabel("WPM", fontsize=12)
-            ax.set_ylabel("Percentage (%)", fontsize=12)
-            ax.grid(axis='y', alpha=0.6, linewidth=1.2, color='gray')
-
-            max_y = max(percentages) * 1.1
-            yticks = np.linspace(0, max_y, num=5)
-            rounded_yticks = [round(y) for y in yticks]
-            ax.set_ylim(0, max_y)
-            ax.set_yticks(rounded_yticks)
-
-        if self.main_window.dark_mode:
-            apply_dark_theme(ax)
-        else:
-            apply_light_theme(ax)
-
-        self.canvas.figure.tight_layout()
-        self.canvas.draw()
+        self.dirty = True
+        self.scheduler.request_full()
+
+    def plot_summary(self):
+        # reads run on the query service, intermediate slider positions are dropped there
+        start, end = self.start_time, self.end_time
+        self.queries.submit("summary", lambda db: read_histogram(db, start, end), self.on_histogram)
+
+    def on_histogram(self, histogram):
+        if histogram.range != (self.start_time, self.end_time):
+            # the slider moved on while this was read, the read for the new range is already scheduled
+            return
+
+        changed = not np.array_equal(histogram.counts, self.histogram.counts)
+        self.histogram = histogram
+        if changed or self.dirty:
+            self.dirty = False
+            self.render_histogram()
+
+    def render_histogram(self, bin_width=5):
+        # everything the render thread needs, it never reads the view or the database
+        job = {
+            "width": self.view.width(),
+            "height": self.view.height(),
+            "device_pixel_ratio": self.view.devicePixelRatioF(),
+            "dark_mode": self.main_window.dark_mode,
+            "color": self.color,
+            "bin_width": bin_width,
+            "title": f"distribution from {self.title_from} to {self.title_to}",
+            "counts": None,
+        }
+        if self.histogram.distinct > 1:
+            with perf.timed("summary.histogram"):
+                job["counts"], job["bin_edges"] = self.histogram.binned(bin_width)
+            job["x_min"], job["x_max"] = self.histogram.min_value, self.histogram.max_value
+            job["quantiles"] = self.histogram.quantiles([q for q, _, _ in QUANTILE_MARKERS])
+
+        self.view.request(job)
+
+    def on_view_resized(self):
+        self.dirty = True
+        self.scheduler.request_motion()
+
+    def stop(self):
+        self.queries.cancel("summary")
+        self.view.stop()
+
+
+def read_histogram(db, start, end):
+    # runs on a query worker, served from the histogram index so a year costs about as much as an hour
+    histogram = WPMHistogram()
+    histogram.reset(start, end)
+    with perf.timed("summary.read"):
+        histogram.add_counts(db.read_histogram(start, end))
+    return histogram
+
+
+def render_summary(job, is_current):
+    # runs on the render thread with a figure that belongs to no widget
+    figure = Figure(figsize=(job["width"] / DPI, job["height"] / DPI), dpi=DPI * job["device_pixel_ratio"])
+    canvas = FigureCanvasAgg(figure)
+    ax = figure.add_subplot(111)
+
+    if job["counts"] is None:
+        ax.set_title("Not enough data available")
+
+    else:
+        counts, bin_edges, bin_width = job["counts"], job["bin_edges"], job["bin_width"]
+        percentages = (counts / sum(counts)) * 100
+        bin_centers = (bin_edges[:-1] + bin_edges[1:]) / 2
+
+        ax.bar(bin_centers, percentages, width=bin_width,
+               color=job["color"], alpha=0.7, align='center')
+
+        text_color = "#ECEFF4" if job["dark_mode"] else "#3B4252"
+        for q, label, style in QUANTILE_MARKERS:
+            value = job["quantiles"][q]
+            ax.axvline(value, color=text_color, linestyle=style, linewidth=1.5, label=f"{label}: {value} WPM")
+
+        x_min, x_max = job["x_min"], job["x_max"]
+        x_pad = (x_max - x_min) * 0.1
+        ax.set_xlim(x_min - x_pad, x_max + x_pad)
+
+        # Determine x-axis ticks step size: 10 or 20
+        wpm_range = x_max - x_min
+        x_step = 20 if wpm_range > 100 else 10
+        xticks = np.arange(round((x_min - x_pad) / x_step) * x_step,
+                           round((x_max + x_pad) / x_step) * x_step + x_step,
+                           x_step)
+        ax.set_xticks(xticks)
+
+        ax.set_title(job["title"], fontsize=12, fontweight='bold')
+        ax.set_xlabel("WPM", fontsize=12)
+        ax.set_ylabel("Percentage (%)", fontsize=12)
+        ax.grid(axis='y', alpha=0.6, linewidth=1.2, color='gray')
+
+        max_y = max(percentages) * 1.1
+        yticks = np.linspace(0, max_y, num=5)
+        rounded_yticks = [round(y) for y in yticks]
+        ax.set_ylim(0, max_y)
+        ax.set_yticks(rounded_yticks)
+
+    if job["dark_mode"]:
+        apply_dark_theme(ax)
+    else:
+        apply_light_theme(ax)
+    if job["counts"] is not None:
+        ax.legend(loc="upper right", facecolor=ax.get_facecolor(), edgecolor=text_color, labelcolor=text_color)
+
+    if not is_current():
+        return None
+    with perf.timed("summary.layout"):
+        figure.tight_layout()
+    if not is_current():
+        return None
+    with perf.timed("summary.draw"):
+        canvas.draw()
+
+    # the Agg buffer goes away with the figure, the image keeps its own copy
+    width, height = canvas.get_width_height(physical=True)
+    image = QImage(canvas.buffer_rgba(), width, height, QImage.Format.Format_RGBA8888).copy()
+    image.setDevicePixelRatio(job["device_pixel_ratio"])
+    return image
@@ -170,11 +170,16 @@ class TimeRangeSlider(QWidget):
         val = max(0, min(self.duration_minutes, val))
         val = (val // self.step_minutes) * self.step_minutes  # Snap to 5-minute step
 
+        previous = (self.start_val, self.end_val)
         if self.dragging_start:
             self.start_val = min(val, self.end_val - self.step_minutes)
         elif self.dragging_end:
             self.end_val = max(val, self.start_val + self.step_minutes)
 
+        # moves within one step don't change the range
+        if (self.start_val, self.end_val) == previous:
+            return
+
         self.rangeChanged.emit(self._val_to_ts(self.start_val), self._val_to_ts(self.end_val))
         self.update()
 
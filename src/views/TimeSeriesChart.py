@@ -0,0 +1,230 @@
+import copy
+import math
+
+import numpy as np
+from PyQt6.QtCore import Qt, QRectF, QPointF, QLineF, QTimer, pyqtSignal
+from PyQt6.QtGui import QPainter, QFont, QColor, QPen, QFontMetrics
+
+from src import perf
+from src.views.RenderedView import RenderedView, new_image
+
+# tick steps tried per decade, the same ones matplotlib's default locator uses
+TICK_STEPS = [1, 2, 2.5, 5, 10]
+MAX_Y_TICKS = 9
+TICK_LENGTH = 4
+PADDING = 8
+BAR_ALPHA = 0.8
+GRID_ALPHA = 0.6
+WHEEL_STEP = 120  # angleDelta of one notch
+
+
+def nice_ticks(low, high, max_ticks=MAX_Y_TICKS):
+    # evenly spaced round values covering [low, high], at most max_ticks intervals
+    if high <= low:
+        return np.array([low])
+
+    raw_step = (high - low) / max(1, max_ticks)
+    scale = 10 ** math.floor(math.log10(raw_step))
+    step = next(s * scale for s in TICK_STEPS if s * scale >= raw_step * (1 - 1e-9))
+
+    first = math.ceil(low / step - 1e-9) * step
+    ticks = np.arange(first, high + step * 1e-9, step)
+    return ticks
+
+
+def format_tick(value):
+    return f"{value:.1f}" if value != int(value) else str(int(value))
+
+
+class ChartState:
+    # everything a frame is drawn from, the worker draws from its own copy
+    def __init__(self, y_label):
+        self.width, self.height, self.device_pixel_ratio = 1, 1, 1.0
+        self.y_label = y_label
+        self.title = ""
+        self.x_min, self.x_max = 0.0, 1.0
+        self.y_max = 1.0
+        self.bar_left = np.empty(0)
+        self.bar_width = np.empty(0)
+        self.bar_height = np.empty(0)
+        self.tick_positions = np.empty(0)
+        self.tick_labels = []
+        self.bar_color = QColor("steelblue")
+
+        self.tick_font = QFont("Arial", 10)
+        self.label_font = QFont("Arial", 12)
+        self.title_font = QFont("Arial", 12, QFont.Weight.Bold)
+
+        self.colors = {
+            "face": QColor("#0a3b3b"),
+            "text": QColor("#ECEFF4"),
+            "grid": QColor("gray"),
+        }
+        self.colors["grid"].setAlphaF(GRID_ALPHA)
+
+
+def plot_rect(state, y_ticks):
+    # room for the y label and tick labels on the left, rotated x labels below, title above
+    tick_metrics = QFontMetrics(state.tick_font)
+    y_tick_width = max(tick_metrics.horizontalAdvance(format_tick(v)) for v in y_ticks)
+    left = PADDING + QFontMetrics(state.label_font).height() + PADDING + y_tick_width + TICK_LENGTH + 2
+
+    x_label_width = max((tick_metrics.horizontalAdvance(label) for label in state.tick_labels), default=0)
+    bottom = TICK_LENGTH + 2 + (x_label_width + tick_metrics.height()) * math.sqrt(0.5) + PADDING
+
+    top = PADDING + QFontMetrics(state.title_font).height() + PADDING
+    return QRectF(left, top, max(1, state.width - left - 2 * PADDING), max(1, state.height - top - bottom))
+
+
+def render_chart(state, is_current):
+    # runs on the render thread, QPainter on a QImage is safe there
+    with perf.timed("chart.render"):
+        image = new_image(state.width, state.height, state.device_pixel_ratio)
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+
+        tick_height = QFontMetrics(state.tick_font).height()
+        y_ticks = nice_ticks(0, state.y_max, min(MAX_Y_TICKS, max(2, int(state.height / (3 * tick_height)))))
+        rect = plot_rect(state, y_ticks)
+        x_scale = rect.width() / (state.x_max - state.x_min) if state.x_max > state.x_min else 0
+        y_scale = rect.height() / state.y_max
+
+        painter.fillRect(rect, state.colors["face"])
+
+        # horizontal grid
+        y_pixels = rect.bottom() - y_ticks * y_scale
+        painter.setPen(QPen(state.colors["grid"], 1.2))
+        painter.drawLines([QLineF(rect.left(), y, rect.right(), y) for y in y_pixels])
+
+        # bars, converted to pixels in one go
+        if len(state.bar_left):
+            left = rect.left() + (state.bar_left - state.x_min) * x_scale
+            width = state.bar_width * x_scale
+            height = np.minimum(state.bar_height, state.y_max) * y_scale
+            painter.save()
+            painter.setClipRect(rect)
+            # antialiased edges leave hairline seams between neighbouring bars
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing, False)
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(state.bar_color)
+            painter.drawRects([QRectF(x, rect.bottom() - h, w, h) for x, w, h in zip(left, width, height)])
+            painter.restore()
+
+        if not is_current():
+            painter.end()
+            return None
+
+        painter.setPen(QPen(state.colors["text"], 1))
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        painter.drawRect(rect)
+
+        # y ticks and labels
+        painter.setFont(state.tick_font)
+        metrics = painter.fontMetrics()
+        for value, y in zip(y_ticks, y_pixels):
+            painter.drawLine(QLineF(rect.left() - TICK_LENGTH, y, rect.left(), y))
+            label = format_tick(value)
+            painter.drawText(QPointF(rect.left() - TICK_LENGTH - 2 - metrics.horizontalAdvance(label),
+                                     y + metrics.ascent() / 2 - 1), label)
+
+        # x ticks, labels rotated by 45 degrees and right-aligned to their tick
+        for ts, label in zip(state.tick_positions, state.tick_labels):
+            if not state.x_min <= ts <= state.x_max:
+                continue
+            x = rect.left() + (ts - state.x_min) * x_scale
+            painter.drawLine(QLineF(x, rect.bottom(), x, rect.bottom() + TICK_LENGTH))
+            painter.save()
+            painter.translate(x, rect.bottom() + TICK_LENGTH + 2)
+            painter.rotate(-45)
+            painter.drawText(QPointF(-metrics.horizontalAdvance(label), metrics.ascent()), label)
+            painter.restore()
+
+        if state.y_label:
+            painter.save()
+            painter.setFont(state.label_font)
+            label_width = painter.fontMetrics().horizontalAdvance(state.y_label)
+            painter.translate(PADDING + painter.fontMetrics().ascent(), rect.center().y() + label_width / 2)
+            painter.rotate(-90)
+            painter.drawText(QPointF(0, 0), state.y_label)
+            painter.restore()
+
+        if state.title:
+            painter.setFont(state.title_font)
+            title_width = painter.fontMetrics().horizontalAdvance(state.title)
+            painter.drawText(QPointF(rect.center().x() - title_width / 2, rect.top() - PADDING), state.title)
+
+        painter.end()
+        return image
+
+
+class TimeSeriesChart(RenderedView):
+    # one signal per wheel notch: +1 up, -1 down
+    scrolled = pyqtSignal(int)
+
+    def __init__(self, y_label=""):
+        super().__init__(render_chart)
+        self.state = ChartState(y_label)
+        self.wheel_remainder = 0
+
+        # all changes made in one pass of the event loop go into a single render
+        self.render_timer = QTimer(self)
+        self.render_timer.setSingleShot(True)
+        self.render_timer.setInterval(0)
+        self.render_timer.timeout.connect(self.request_render)
+        self.resized.connect(self.render_timer.start)
+
+    def edit(self):
+        # copy on write, the state handed to the worker is never changed afterwards
+        self.state = copy.copy(self.state)
+        self.render_timer.start()
+        return self.state
+
+    def request_render(self):
+        # also called directly by owners that have finished their changes, saving the wait for the timer
+        self.render_timer.stop()
+        state = self.state = copy.copy(self.state)
+        state.width, state.height = self.width(), self.height()
+        state.device_pixel_ratio = self.devicePixelRatioF()
+        self.request(state)
+
+    def apply_dark_theme(self):
+        self.edit().colors = dict(self.state.colors, face=QColor("#0a3b3b"), text=QColor("#ECEFF4"))
+
+    def apply_light_theme(self):
+        self.edit().colors = dict(self.state.colors, face=QColor("#cbe7e3"), text=QColor("#3B4252"))
+
+    def set_bar_color(self, color):
+        bar_color = QColor(color)
+        bar_color.setAlphaF(BAR_ALPHA)
+        self.edit().bar_color = bar_color
+
+    def set_bars(self, edges, heights):
+        # edges has one more entry than heights, bars with a NaN height are not drawn
+        edges = np.asarray(edges, dtype=np.float64)
+        heights = np.asarray(heights, dtype=np.float64)
+        valid = ~np.isnan(heights)
+        state = self.edit()
+        state.x_min, state.x_max = float(edges[0]), float(edges[-1])
+        state.bar_left = edges[:-1][valid]
+        state.bar_width = np.diff(edges)[valid]
+        state.bar_height = heights[valid]
+
+    def set_ticks(self, positions, labels):
+        state = self.edit()
+        state.tick_positions = np.asarray(positions, dtype=np.float64)
+        state.tick_labels = [str(label) for label in labels]
+
+    def set_title(self, title):
+        self.edit().title = title
+
+    def set_y_max(self, y_max):
+        self.edit().y_max = y_max if y_max > 0 else 1.0
+
+    def wheelEvent(self, event):
+        # trackpads send fractions of a notch, they add up to whole steps
+        self.wheel_remainder += event.angleDelta().y()
+        steps = int(self.wheel_remainder / WHEEL_STEP)
+        self.wheel_remainder -= steps * WHEEL_STEP
+        for _ in range(abs(steps)):
+            self.scrolled.emit(1 if steps > 0 else -1)
+        event.accept()
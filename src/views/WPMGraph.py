@@ -2,17 +2,24 @@ import time
 from datetime import datetime, timedelta
 
 import numpy as np
-from PyQt6.QtCore import QTimer, Qt
+from PyQt6.QtCore import QTimer
 from PyQt6.QtGui import QFont
-from PyQt6.QtWidgets import QFrame, QVBoxLayout, QSizePolicy, QHBoxLayout, QToolTip, QSpacerItem, QWidget, QLabel
+from PyQt6.QtWidgets import QFrame, QVBoxLayout, QSizePolicy, QHBoxLayout, QToolTip, QSpacerItem
 
 from src.views.ToggleDarkmodeButton import ToggleDarkmodeButton
 from src.views.LabelSelection import LabelSelection
 from src.views.ResetButton import ResetButton
 from src.views.InfoButton import InfoButton
-from src.utils import apply_dark_theme, apply_light_theme, save_config, check_input_monitoring_trusted
+from src.views.TimeSeriesChart import TimeSeriesChart
+from src import perf
+from src.binning import bin_values, bin_aggregates
+from src.prefetcher import WindowPrefetcher
+from src.render_scheduler import RenderScheduler
+from src.rollups import rollup_level_for
+from src.utils import save_config, check_input_monitoring_trusted
 
 SPP = 1 / 5
+PREFETCH_DEPTH = 3
 
 class WPMGraph(QFrame):
     def __init__(self, main, db, bin_size):
@@ -68,33 +75,26 @@ class WPMGraph(QFrame):
 
         layout.addLayout(controls_layout)
 
-        self.canvas_container = QWidget()
-        self.canvas_container.setFixedHeight(600)
-        self.canvas_container_layout = QVBoxLayout(self.canvas_container)
-        self.loading_label = QLabel("Loading...")
-        self.loading_label.setStyleSheet("font-size: 16px; color: gray;")
-        self.canvas_container_layout.addWidget(self.loading_label, alignment=Qt.AlignmentFlag.AlignCenter)
-        self.canvas = None
-        layout.addWidget(self.canvas_container)
-
-        def init_canvas():
-            from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
-            from matplotlib.figure import Figure
-            self.canvas = FigureCanvas(Figure(figsize=(8, 4)))
-            self.canvas.setFixedHeight(600)
-            self.canvas.mpl_connect("scroll_event", self.on_scroll)
-            self.canvas.setToolTip("scroll to change current position")
-            QToolTip.setFont(QFont("Arial", 18))
-
-            self.loading_label.hide()
-            self.canvas_container_layout.addWidget(self.canvas)
-            self.plot()
-
-        timer = QTimer()
-        timer.singleShot(2000, init_canvas)
+        # painted natively, so the monitoring tab never has to import matplotlib
+        self.chart = TimeSeriesChart(y_label='Words Per Minute (WPM)')
+        self.chart.setFixedHeight(600)
+        self.chart.scrolled.connect(self.on_scroll)
+        self.chart.setToolTip("scroll to change current position")
+        QToolTip.setFont(QFont("Arial", 18))
+        self.scheduler = RenderScheduler(self.plot, self.plot_motion, parent=self)
+
+        # neighbouring windows are loaded ahead of time on a separate connection over the same cache
+        self.prefetch_db = db.share()
+        self.prefetcher = WindowPrefetcher(lambda key: self.load_window(key, self.prefetch_db))
+        self.window_version = None
+        self.scroll_direction = 0
+        self.rendered_window = None
+        self.rendered_state = None
+        layout.addWidget(self.chart)
         layout.addStretch()
 
         self.main_window.modeToggled.connect(self.apply_style)
+        self.main_window.notifier.dataChanged.connect(self.on_data_changed)
 
         # initial plot and theme setting
         self.apply_style()
@@ -103,6 +103,12 @@ class WPMGraph(QFrame):
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.update_plot)
         self.timer.start(2000)
+
+    def stop(self):
+        self.chart.stop()
+        self.prefetcher.shutdown()
+        self.prefetch_db.close()
+
     def pause(self):
         if not self.is_paused:
             self.timer.stop()
@@ -119,41 +125,48 @@ class WPMGraph(QFrame):
             self.label_selection.apply_dark_theme()
             self.back_to_start.apply_dark_theme()
             self.info_button.apply_dark_theme()
+            self.chart.apply_dark_theme()
             self.color = '#699191'
         else:
             self.label_selection.apply_light_theme()
             self.back_to_start.apply_light_theme()
             self.info_button.apply_light_theme()
+            self.chart.apply_light_theme()
             self.color = 'steelblue'
 
         self.toggle.apply_style()
-        self.plot()
+        self.scheduler.request_full()
 
     def resizeEvent(self, event):
         self.interval_size = self.width() * self.seconds_per_pixel * self.mult
-        self.plot()
+        self.scheduler.request_motion()
         super().resizeEvent(event)
 
     def update_plot(self):
         if not self.custom_interval:
             self.interval_end = time.time() + self.bin_size
-            self.plot()
+            self.scheduler.request_full()
+
+    def on_data_changed(self):
+        # paused views catch up in resume()
+        if not self.is_paused:
+            self.scheduler.request_full()
 
-    def on_scroll(self, event):
+    def on_scroll(self, direction):
+        # direction is +1 for up, -1 for down
         if self.is_paused:
             return
 
         self.custom_interval = True
-        if self.canvas:
-            self.canvas.setToolTip("")
-        direction = event.step  # +1 for up, -1 for down
+        self.chart.setToolTip("")
         self.interval_end += -direction * self.mult
-        self.plot()
+        self.scroll_direction = -1 if direction > 0 else 1
+        self.scheduler.request_motion()
 
     def reset_position(self):
         self.custom_interval = False
         self.interval_end = time.time() + self.bin_size
-        self.plot()
+        self.scheduler.request_full()
 
     def get_last_bin(self):
         return (self.interval_end // self.bin_size) * self.bin_size
@@ -161,7 +174,7 @@ class WPMGraph(QFrame):
     def update_spp(self, num_pixels):
         self.seconds_per_pixel = 1 / num_pixels
         self.interval_size = self.width() * self.seconds_per_pixel * self.mult
-        self.plot()
+        self.scheduler.request_full()
 
     def update_mult(self, text):
         if text == "1 min":
@@ -188,52 +201,65 @@ class WPMGraph(QFrame):
         self.bin_size = (self.bin_size // self.mult) * new_mult
         self.interval_size = (self.interval_size // self.mult) * new_mult
         self.mult = new_mult
-        self.plot()
+        self.scheduler.request_full()
 
         self.main_window.config["mult"] = new_mult
         save_config(self.main_window.config)
 
 
-    def plot(self):
-        if not self.canvas:
-            return
-
-        last_bin = self.get_last_bin()
-        interval_start = last_bin - self.interval_size
-        time_bins = np.arange(interval_start, last_bin + self.bin_size, self.bin_size)
-
-        data = self.db.read_data(interval_start, time_bins[-1])
-
-        all_bin_centers = []
-        all_wpm_values = []
-
-        for i in range(len(time_bins) - 1):
-            bin_start = time_bins[i]
-            bin_end = time_bins[i + 1]
-            bin_center = (bin_start + bin_end) / 2
-
-            all_bin_centers.append(bin_center)
-            bin_data = [val for ts, val in data if bin_start <= ts < bin_end]
-            all_wpm_values.append(np.mean(bin_data) if bin_data else np.nan)
-
-        self.canvas.figure.clear()
-        ax = self.canvas.figure.add_subplot(111)
-
-        x_vals = np.array(all_bin_centers)
-        y_vals = np.array(all_wpm_values)
-        valid_mask = ~np.isnan(y_vals)
-
-        if valid_mask.any():
-            ax.bar(x_vals[valid_mask], y_vals[valid_mask], width=self.bin_size,
-                   color=self.color, alpha=0.8, align='center')
-
-        ax.set_xlim(time_bins[0], time_bins[-1])
-
+    def load_bins(self, time_bins, bin_size, db):
+        start, end = float(time_bins[0]), float(time_bins[-1])
+        level = rollup_level_for(bin_size)
+        if level is None:
+            timestamps, values = db.read_series(start, end)
+            with perf.timed("wpm.binning"):
+                return bin_values(timestamps, values, time_bins)
+
+        rows = db.read_rollup(level, start, end)
+        with perf.timed("wpm.binning"):
+            buckets, sums, counts, minimums, maximums = np.array(rows, dtype=np.float64).reshape(-1, 5).T
+            return bin_aggregates(buckets, sums, counts, minimums, maximums, time_bins)
+
+    def get_window_key(self):
+        n_bins = int(np.ceil(self.interval_size / self.bin_size))
+        return self.mult, self.bin_size, n_bins, self.get_last_bin()
+
+    def get_time_bins(self, key):
+        # bins start on multiples of the bin size, so rollup buckets never straddle them
+        _, bin_size, n_bins, last_bin = key
+        return last_bin + np.arange(-n_bins, 1) * bin_size
+
+    def load_window(self, key, db):
+        # also runs on the prefetch thread, so it only reads the key and the given db
+        mult, bin_size, _, _ = key
+        time_bins = self.get_time_bins(key)
+        binned = self.load_bins(time_bins, bin_size, db)
+        _, center_ts, distance = self.get_title(time_bins, mult)
+        y_max = db.get_max(center_ts, distance) * 1.25
+        return time_bins, binned, y_max
+
+    def get_window(self, key):
+        version = self.db.data_version()
+        if version != self.window_version:
+            self.prefetcher.clear()
+            self.window_version = version
+        return self.prefetcher.get(key, lambda key: self.load_window(key, self.db))
+
+    def prefetch_neighbours(self, key):
+        # windows further along the current scroll direction, plus one behind
+        mult, bin_size, n_bins, last_bin = key
+        direction = self.scroll_direction or -1
+        live_last_bin = ((time.time() + bin_size) // bin_size) * bin_size
+        steps = [direction * k for k in range(1, PREFETCH_DEPTH + 1)] + [-direction]
+        self.prefetcher.prefetch([(mult, bin_size, n_bins, last_bin + step * bin_size)
+                                  for step in steps if last_bin + step * bin_size <= live_last_bin])
+
+    def get_tick_labels(self, bin_centers):
         label_positions = []
         label_strings = []
         seen_keys = set()
 
-        for ts in all_bin_centers:
+        for ts in bin_centers:
             dt = datetime.fromtimestamp(ts)
 
             if self.mult <= 60:  # Minute-level (1s, 5s, etc.)
@@ -266,13 +292,13 @@ class WPMGraph(QFrame):
         else:
             first_label = 0
 
-        ax.set_xticks(label_positions[first_label:])
-        ax.set_xticklabels(label_strings[first_label:], rotation=45, ha='right')
+        return label_positions[first_label:], label_strings[first_label:]
 
+    def get_title(self, time_bins, mult):
         title = ""
         center_ts = (time_bins[0] * 2 + time_bins[-1] * 3) / 5
         dt = datetime.fromtimestamp(center_ts)
-        if self.mult <= 60:
+        if mult <= 60:
             today = datetime.now()
             if dt.day == today.day:
                 title = "today"
@@ -280,32 +306,73 @@ class WPMGraph(QFrame):
                 title = dt.strftime("%d %b %Y")
             distance = 60 * 60 * 24    # 1 day
 
-        elif self.mult == 60 * 24:
+        elif mult == 60 * 24:
             title = dt.strftime("%b %Y")
             distance = 60 * 60 * 24 * 7 * 2  # 2 weeks
 
-        elif self.mult == 60 * 24 * 7:
+        elif mult == 60 * 24 * 7:
             title = dt.strftime("%b %Y")
             distance = 60 * 60 * 24 * 30 * 2  # 2 months
 
-        elif self.mult == 60 * 24 * 30:
+        elif mult == 60 * 24 * 30:
             title = dt.strftime("%Y")
             distance = 60 * 60 * 24 * 30 * 12  # 1 year
 
         else:
             distance = 60 * 60 * 24 * 30 * 12 * 10  # 1 decade
 
-        ax.set_ylabel('Words Per Minute (WPM)', fontsize=12)
-        ax.set_title(title, fontsize=12, fontweight='bold')
-        ax.grid(axis='y', alpha=0.6, linewidth=1.2, color='gray')
+        return title, center_ts, distance
 
-        y_max = self.db.get_max(center_ts, distance) * 1.25
-        ax.set_ylim(0, y_max)
+    def plot(self):
+        key = self.get_window_key()
+        with perf.timed("wpm.window"):
+            window = self.get_window(key)
+        time_bins, binned, y_max = window
+        title, _, _ = self.get_title(time_bins, self.mult)
+
+        # the clock tick and data notifications only redraw when what is shown would change
+        state = (title, self.color, self.main_window.dark_mode)
+        if state == self.rendered_state and not self.window_changed(window):
+            return
 
-        if self.main_window.dark_mode:
-            apply_dark_theme(ax)
-        else:
-            apply_light_theme(ax)
+        with perf.timed("wpm.ticks"):
+            label_positions, label_strings = self.get_tick_labels((time_bins[:-1] + time_bins[1:]) / 2)
+        with perf.timed("wpm.render"):
+            self.render(time_bins, binned.mean, label_positions, label_strings, title, y_max)
+        self.rendered_window = window
+        self.rendered_state = state
+        self.prefetch_neighbours(key)
+
+    def window_changed(self, window):
+        if self.rendered_window is None:
+            return True
+        if window is self.rendered_window:
+            return False
+
+        time_bins, binned, y_max = window
+        old_bins, old_binned, old_y_max = self.rendered_window
+        return not (np.array_equal(time_bins, old_bins)
+                    and np.array_equal(binned.mean, old_binned.mean, equal_nan=True)
+                    and y_max == old_y_max)
+
+    def plot_motion(self):
+        # scroll/resize frames: only the bars move, ticks, title and y-limit catch up
+        # in the full render once motion stops
+        if self.rendered_state is None:
+            self.plot()
+            return
 
-        self.canvas.figure.tight_layout()
-        self.canvas.draw()
+        key = self.get_window_key()
+        time_bins, binned, _ = self.get_window(key)
+        self.chart.set_bars(time_bins, binned.mean)
+        self.chart.request_render()
+        self.rendered_window = None
+        self.prefetch_neighbours(key)
+
+    def render(self, time_bins, wpm_values, label_positions, label_strings, title, y_max):
+        self.chart.set_bars(time_bins, wpm_values)
+        self.chart.set_ticks(label_positions, label_strings)
+        self.chart.set_title(title)
+        self.chart.set_y_max(y_max)
+        self.chart.set_bar_color(self.color)
+        self.chart.request_render()
@@ -0,0 +1,140 @@
+import queue
+import threading
+import time
+
+from src.interval_archive import pack_key_times
+
+_STOP = object()
+_INTERVALS = object()
+
+
+class WriteQueue:
+    def __init__(self, db, max_size=1024, batch_size=64, max_delay=1.0, max_pending=4096, max_retry_delay=60.0):
+        self.db = db
+        self.queue = queue.Queue(maxsize=max_size)
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        # while commits fail the rows wait in memory, at most max_pending of them,
+        # and the retries back off from max_delay up to max_retry_delay
+        self.max_pending = max_pending
+        self.max_retry_delay = max_retry_delay
+
+        # counters, only the writer thread updates them (apart from dropped)
+        self.rows_written = 0
+        self.commits = 0
+        self.failed_commits = 0
+        self.dropped = 0
+        self.dropped_pending = 0
+        self.last_commit_latency = 0.0
+        self.max_commit_latency = 0.0
+        self.total_commit_latency = 0.0
+
+        self.commit_listeners = []
+
+        self.thread = threading.Thread(target=self._run, name="TypeSpeedMonitor-writer", daemon=True)
+        self.thread.start()
+
+    @property
+    def depth(self):
+        return self.queue.qsize()
+
+    def put(self, timestamp, value):
+        # called from the keyboard hook, so never block: drop the bin if the writer is that far behind
+        try:
+            self.queue.put_nowait((timestamp, value))
+        except queue.Full:
+            self.dropped += 1
+
+    def put_intervals(self, key_times, offset):
+        # the key times of one bin for the interval archive, packed on the writer thread
+        # and committed in the same transaction as the bins around it
+        try:
+            self.queue.put_nowait((_INTERVALS, key_times, offset))
+        except queue.Full:
+            self.dropped += 1
+
+    def add_commit_listener(self, listener):
+        # called on the writer thread after every successful commit
+        self.commit_listeners.append(listener)
+
+    def stats(self):
+        return {
+            "queue_depth": self.depth,
+            "rows_written": self.rows_written,
+            "commits": self.commits,
+            "failed_commits": self.failed_commits,
+            "dropped": self.dropped,
+            "dropped_pending": self.dropped_pending,
+            "last_commit_latency": self.last_commit_latency,
+            "max_commit_latency": self.max_commit_latency,
+            "mean_commit_latency": self.total_commit_latency / self.commits if self.commits else 0.0,
+        }
+
+    def _run(self):
+        pending = []
+        intervals = []
+        deadline = None
+        retry_delay = None
+
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                if pending or intervals:
+                    self._commit(pending, intervals)
+                return
+
+            if item is not None and len(pending) + len(intervals) >= self.max_pending:
+                # the database has been failing for a while, newer items are dropped like a full queue drops them
+                self.dropped_pending += 1
+            elif item is not None:
+                if item[0] is _INTERVALS:
+                    intervals.append(pack_key_times(*item[1:]))
+                else:
+                    pending.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.max_delay
+
+            n_items = len(pending) + len(intervals)
+            # after a failure only the deadline triggers a retry, not every item that arrives
+            full = n_items >= self.batch_size and retry_delay is None
+            if n_items and (full or time.monotonic() >= deadline):
+                if self._commit(pending, intervals):
+                    pending = []
+                    intervals = []
+                    deadline = None
+                    retry_delay = None
+                else:
+                    # keep the rows and retry later, waiting longer after every failure
+                    retry_delay = self.max_delay if retry_delay is None else min(2 * retry_delay,
+                                                                                 self.max_retry_delay)
+                    deadline = time.monotonic() + retry_delay
+
+    def _commit(self, rows, intervals):
+        start = time.perf_counter()
+        try:
+            self.db.insert_many(rows, intervals)
+        except Exception as e:
+            self.failed_commits += 1
+            print(f"Error writing {len(rows)} rows: {e}")
+            return False
+
+        latency = time.perf_counter() - start
+        self.commits += 1
+        self.rows_written += len(rows)
+        self.last_commit_latency = latency
+        self.max_commit_latency = max(self.max_commit_latency, latency)
+        self.total_commit_latency += latency
+
+        for listener in self.commit_listeners:
+            listener()
+        return True
+
+    def stop(self):
+        # flushes everything queued so far before the thread exits
+        self.queue.put(_STOP)
+        self.thread.join()